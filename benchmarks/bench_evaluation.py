@@ -0,0 +1,39 @@
+"""
+Compare the evaluation of a chebfun by the barycentric formula and by the Clenshaw recurrence.
+
+Prints, for each size of fun and number of points, the ratio
+    (barycentric time) / (Clenshaw time)
+so Clenshaw is faster where the ratio is above one.
+The thresholds Polyfun.clenshaw_min_points and Polyfun.clenshaw_points_per_coeff
+are chosen from this table: the crossover lies around 200 points for sizes up to 4,
+300 to 500 points for sizes 6 to 12, and 700 to 1000 points from size 16 on.
+"""
+from __future__ import division, print_function
+
+import timeit
+
+import numpy as np
+from pychebfun import *
+
+sizes = [2, 4, 8, 12, 16, 64, 256, 1024]
+npoints = [1, 10, 100, 200, 300, 500, 700, 1000, 10000, 100000]
+
+def timing(fun, repeat=3):
+    number = 1
+    while True:
+        time = min(timeit.repeat(fun, number=number, repeat=repeat))
+        if time > .05:
+            return time/number
+        number *= 4
+
+print('size \\ points ' + ''.join('{:>9d}'.format(M) for M in npoints))
+for N in sizes:
+    coeffs = np.random.randn(N)
+    p = Chebfun.from_coeff(coeffs, prune=False)
+    ratios = []
+    for M in npoints:
+        t = np.random.uniform(-1, 1, M)
+        barycentric = timing(lambda: p.p(t))
+        clenshaw = timing(lambda: p._clenshaw_call(t))
+        ratios.append(barycentric/clenshaw)
+    print('{:>13d} '.format(N) + ''.join('{:>9.2f}'.format(r) for r in ratios))
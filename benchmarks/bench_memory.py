@@ -0,0 +1,45 @@
+"""
+Memory and time used to construct many small chebfuns.
+
+Prints, for funs constructed from values and from coefficients,
+the memory allocated per fun (measured with tracemalloc)
+and the construction time per fun.
+Funs store only their values, coefficients and domain; with funs of size 8,
+this is about 340 bytes and 4 us per fun constructed from values,
+down from 1100 bytes and 25 us when the interpolator and the vscale were computed eagerly.
+"""
+from __future__ import division, print_function
+
+import gc
+import timeit
+import tracemalloc
+
+import numpy as np
+from pychebfun import *
+
+count = 100000
+size = 8
+
+values = np.random.randn(count, size)
+coeffs = np.random.randn(count, size)
+
+def construct(make, data):
+    return [make(row) for row in data]
+
+constructions = [
+    ('from values', lambda row: Chebfun(row), values),
+    ('from coefficients', lambda row: Chebfun.from_coeff(row, prune=False), coeffs),
+]
+
+print('{} funs of size {}'.format(count, size))
+print('{:>20} {:>12} {:>12}'.format('', 'bytes/fun', 'us/fun'))
+for name, make, data in constructions:
+    gc.collect()
+    tracemalloc.start()
+    funs = construct(make, data)
+    memory, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del funs
+    gc.collect()
+    time = min(timeit.repeat(lambda: construct(make, data[:10000]), number=1, repeat=3))
+    print('{:>20} {:>12.0f} {:>12.2f}'.format(name, memory/count, time/10000*1e6))
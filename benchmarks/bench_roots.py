@@ -0,0 +1,27 @@
+"""
+Compare the root-finders of Chebfun.roots for various sizes of the pieces.
+
+Prints, for each fun and each maximal size of the pieces, the time taken
+by the colleague matrix ('eig') and by the Aberth iteration ('aberth').
+The Aberth iteration costs O(n^2) per piece instead of O(n^3),
+so it only pays off on large pieces, that is, with a large max_size.
+"""
+from __future__ import division, print_function
+
+import timeit
+
+import numpy as np
+from pychebfun import *
+
+frequencies = [100, 300, 1000]
+max_sizes = [50, 100, 200, 400, 800, 1600]
+
+def timing(fun, repeat=3):
+    return min(timeit.repeat(fun, number=1, repeat=repeat))
+
+print('{:>10} {:>6} {:>8}'.format('frequency', 'size', 'solver') + ''.join('{:>9d}'.format(m) for m in max_sizes))
+for k in frequencies:
+    p = Chebfun.from_function(lambda x: np.sin(k*x))
+    for solver in Chebfun.root_solvers:
+        times = [timing(lambda: p.roots(solver=solver, max_size=m)) for m in max_sizes]
+        print('{:>10d} {:>6d} {:>8}'.format(k, p.size(), solver) + ''.join('{:>9.4f}'.format(t) for t in times))
@@ -11,3 +11,7 @@ __version__ = "0.2"
 
 from .plotting import *
 from .chebfun import *
+from .transform import *
+from .lazy import *
+from .batch import *
+from .storage import *
@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+# coding: UTF-8
+"""
+Batch module
+============
+
+A ChebfunArray holds many scalar funs on the same domain in one
+coefficient matrix, with one column per fun::
+
+    funs = ChebfunArray.from_funs([Chebfun.from_function(f) for f in fs])
+    funs(x)          # values of all the funs, shape x.shape + (k,)
+    funs.sum()       # integrals of all the funs, shape (k,)
+    funs.roots()     # list of k arrays of roots
+
+A parametric family x -> g(x, p) is constructed for many parameters at once
+by ChebfunArray.from_family(g, params), which samples all the parameters
+on common grids.
+
+The columns are padded with zeros below the size of each fun,
+so operations on all the funs are done by a few calls on the matrix
+instead of a loop over Chebfun objects.
+
+"""
+from __future__ import division
+
+import numpy as np
+import numpy.polynomial as poly
+
+from .polyfun import Polyfun, standard_chop, resolve_tolerance, max_tolerance
+from .chebfun import Chebfun
+
+class ChebfunArray(object):
+    """
+    k scalar funs on the same domain, stored as a coefficient matrix of shape (n, k).
+    Column j holds the sizes()[j] coefficients of fun j, padded with zeros.
+    """
+
+    # class providing the transforms and the root-finders
+    fun_class = Chebfun
+
+    DomainMismatch = Polyfun.DomainMismatch
+
+    # ----------------------------------------------------------------
+    # Initialisation methods
+    # ----------------------------------------------------------------
+
+    def __init__(self, coeffs, domain=None, vscales=1., sizes=None, tol=None):
+        """
+        coeffs: array of shape (n, k) of Chebyshev coefficients, one column per fun
+        vscales: scales of the funs, used when pruning; scalar or array of shape (k,)
+        sizes: numbers of significant coefficients of the funs; defaults to n.
+        The coefficients beyond the size of each fun are replaced by zeros.
+        tol: the tolerance of the operations on the funs; defaults to get_tolerance()
+        """
+        coeffs = np.asarray(coeffs)
+        if coeffs.ndim != 2:
+            raise ValueError("The coefficients should be a 2-D array")
+        if sizes is None:
+            sizes = len(coeffs)
+        self._sizes = np.broadcast_to(sizes, coeffs.shape[1:]).astype(int)
+        coeffs = coeffs[:np.max(self._sizes, initial=1)]
+        padding = np.arange(len(coeffs))[:, np.newaxis] >= self._sizes
+        if np.any(coeffs[padding]):
+            coeffs = np.where(padding, 0, coeffs)
+        self._coeffs = coeffs
+        self._vscales = np.broadcast_to(vscales, coeffs.shape[1:]).astype(float)
+        self._domain = np.array(self.fun_class.get_default_domain(domain))
+        self._tol = resolve_tolerance(tol)
+        self._values = None
+
+    @classmethod
+    def from_coeff(self, chebcoeff, domain=None, prune=True, vscale=1., tol=None):
+        """
+        Initialise from the coefficient matrix.
+        prune: Whether to prune the negligible coefficients of each fun
+        vscale: the scale to use when pruning; scalar or array of shape (k,)
+        tol: the tolerance used when pruning; defaults to get_tolerance()
+        """
+        tol = resolve_tolerance(tol)
+        coeffs = np.asarray(chebcoeff)
+        if not prune:
+            return self(coeffs, domain, vscale, tol=tol)
+        vscales = np.broadcast_to(vscale, coeffs.shape[1:])
+        return self(coeffs, domain, vscales, self._cutoffs(coeffs, vscales, tol), tol)
+
+    @classmethod
+    def from_data(self, data, domain=None, tol=None):
+        """
+        Initialise from interpolation values.
+        data: array of shape (n, k): the values of each fun at n Chebyshev points
+        """
+        values = np.asarray(data)
+        vscales = np.max(np.abs(values), axis=0)
+        return self(self.fun_class.polyfit(values), domain, vscales, tol=tol)
+
+    @classmethod
+    def from_funs(self, funs):
+        """
+        Initialise from a sequence of scalar funs on the same domain.
+        """
+        funs = list(funs)
+        if not funs:
+            raise ValueError("At least one fun is needed")
+        domain = funs[0].domain()
+        for fun in funs[1:]:
+            if not fun.same_domain(funs[0]):
+                raise self.DomainMismatch(domain, fun.domain())
+        sizes = np.array([fun.size() for fun in funs])
+        dtype = np.result_type(*[fun.coefficients() for fun in funs])
+        coeffs = np.zeros((np.max(sizes), len(funs)), dtype=dtype)
+        for j, fun in enumerate(funs):
+            coeffs[:sizes[j], j] = fun.coefficients()
+        vscales = [fun.vscale() for fun in funs]
+        return self(coeffs, domain, vscales, sizes, max_tolerance(*funs))
+
+    @classmethod
+    def family_dichotomy(self, g, params, kmin=2, kmax=12, raise_no_convergence=True, chop='classic', tol=None):
+        """
+        Compute the coefficients of the functions x -> g(x, p) on [-1,1] for many parameters p
+        by a common dichotomy.
+        All the parameters are sampled on the same nested Chebyshev grids, but the refinement
+        stops separately for each parameter, as soon as its coefficients have converged.
+        g: vectorised function; g(x, p) is called with x of shape (m, 1)
+        and p = params[active] for the parameters still refined, and returns an array of shape (m, len(p))
+        kmin, kmax: log2 of number of interpolation points to try
+        raise_no_convergence: whether to raise an exception if the dichotomy does not converge for some parameter
+        chop: the chopping rule, 'classic' or 'plateau' (see Polyfun.dichotomy);
+        with 'plateau', the sizes are those of the chopped coefficients
+        tol: relative tolerance; defaults to get_tolerance()
+        Return: coefficient matrix with one column per parameter, padded with zeros, and the sizes
+        """
+        cls = self.fun_class
+        cls.check_chop(chop)
+        tol = resolve_tolerance(tol)
+        params = np.asarray(params)
+        active = np.arange(len(params))
+        def f(t):
+            values = np.asarray(g(t[:, np.newaxis], params[active]))
+            return np.broadcast_to(values, (len(t), len(active)))
+        blocks = []
+        sampled = None
+        for k in range(kmin, kmax):
+            N = pow(2, k)
+
+            # 1) Sample the active parameters, reusing the samples of the coarser level
+            if sampled is None:
+                sampled = cls.sample_function(f, N)
+            else:
+                sampled = cls.refine_samples(f, sampled)
+
+            # 2) Compute the Chebyshev coefficients of all the active parameters at once
+            coeffs = cls.polyfit(sampled)
+
+            # 3) Check for negligible coefficients, parameter by parameter
+            if chop == 'plateau':
+                bnd = tol
+                last = abs(coeffs[-2:])
+                cutoffs = standard_chop(coeffs, bnd)
+                done = cutoffs < len(coeffs)
+            else:
+                bnd = cls._threshold(np.max(np.abs(coeffs), axis=0), tol)
+                last = abs(coeffs[-2:])
+                done = np.all(last <= bnd, axis=0)
+                cutoffs = np.full(len(done), len(coeffs))
+            blocks.append((active[done], coeffs[:, done], cutoffs[done]))
+            active = active[~done]
+            sampled = sampled[:, ~done]
+            if not len(active):
+                break
+        else:
+            if raise_no_convergence:
+                raise cls.NoConvergence(last[:, ~done], np.broadcast_to(bnd, done.shape)[~done])
+            blocks.append((active, coeffs[:, ~done], cutoffs[~done]))
+
+        # gather the parameters which stopped at each level
+        size = max(np.max(block_sizes) for indices, block, block_sizes in blocks if len(indices))
+        dtype = np.result_type(*[block for indices, block, block_sizes in blocks])
+        matrix = np.zeros((size, len(params)), dtype=dtype)
+        sizes = np.zeros(len(params), dtype=int)
+        for indices, block, block_sizes in blocks:
+            chopped = np.arange(len(block))[:, np.newaxis] >= block_sizes
+            matrix[:len(block), indices] = np.where(chopped, 0, block)[:size]
+            sizes[indices] = block_sizes
+        return matrix, sizes
+
+    @classmethod
+    def from_family(self, g, params, domain=None, N=None, chop='classic', tol=None):
+        """
+        Initialise from a parametric family of functions, one fun per parameter:
+        fun j approximates x -> g(x, params[j]) on the domain.
+        This gives the same funs as Chebfun.from_function for each parameter,
+        but all the parameters are sampled and transformed together.
+        g: vectorised function; g(x, p) is called with x of shape (m, 1) and p a subarray of params,
+        and returns an array of shape (m, len(p))
+        params: array of parameters, the first dimension indexing the members of the family
+        N: optional parameter which indicates the range of the dichotomy
+        chop: the chopping rule, 'classic' or 'plateau' (see Polyfun.dichotomy)
+        tol: relative tolerance, which stays with the funs; defaults to get_tolerance()
+        """
+        domain = self.fun_class.get_default_domain(domain)
+        a,b = domain[0], domain[-1]
+        map_ui_ab = lambda t: 0.5*(b-a)*t + 0.5*(a+b)
+        tol = resolve_tolerance(tol)
+        args = {'g': lambda t, p: g(map_ui_ab(t), p), 'params': params, 'chop': chop, 'tol': tol}
+        if N is not None: # N is provided
+            nextpow2 = int(np.log2(N))+1
+            args['kmin'] = nextpow2
+            args['kmax'] = nextpow2+1
+            args['raise_no_convergence'] = False
+        else:
+            args['raise_no_convergence'] = True
+
+        coeffs, sizes = self.family_dichotomy(**args)
+        if chop == 'plateau':
+            # the plateau rule has already chopped the coefficients
+            return self(coeffs, domain, sizes=sizes, tol=tol)
+        return self.from_coeff(coeffs, domain, tol=tol)
+
+    @classmethod
+    def _cutoffs(self, coeffs, vscales, tol=None):
+        """
+        Cutoff index of each column, after which the coefficients are deemed negligible.
+        """
+        significant = np.abs(coeffs) >= self.fun_class._threshold(np.asarray(vscales), tol)
+        last = len(coeffs) - 1 - np.argmax(significant[::-1], axis=0)
+        last[~np.any(significant, axis=0)] = 0
+        return last + 1
+
+    # ----------------------------------------------------------------
+    # Attributes
+    # ----------------------------------------------------------------
+
+    def __len__(self):
+        return self._coeffs.shape[1]
+
+    def size(self):
+        """
+        Number of rows of the coefficient matrix, i.e., the largest size of the funs.
+        """
+        return len(self._coeffs)
+
+    def sizes(self):
+        return self._sizes
+
+    def domain(self):
+        return self._domain
+
+    def tolerance(self):
+        return self._tol
+
+    def coefficients(self):
+        """
+        Coefficient matrix of shape (size(), k).
+        """
+        return self._coeffs
+
+    def values(self):
+        """
+        Values of all the funs at the size() Chebyshev points, computed once and then stored.
+        """
+        if self._values is None:
+            self._values = self.fun_class.polyval(self._coeffs)
+        return self._values
+
+    def same_domain(self, other):
+        return np.allclose(self.domain(), other.domain(), rtol=1e-14, atol=1e-14)
+
+    def _ab_to_ui(self, x):
+        a, b = self._domain
+        return (2.0*x-a-b)/(b-a)
+
+    def _ui_to_ab(self, t):
+        a, b = self._domain
+        return 0.5*(b-a)*t + 0.5*(a+b)
+
+    def __repr__(self):
+        a, b = self.domain()
+        return '{} of {} funs on [{:.1f}, {:.1f}], sizes {} to {}'.format(
+            type(self).__name__, len(self), a, b, np.min(self._sizes), np.max(self._sizes))
+
+    def __str__(self):
+        return "<{}({}x{})>".format(type(self).__name__, self.size(), len(self))
+
+    # ----------------------------------------------------------------
+    # Access to the funs
+    # ----------------------------------------------------------------
+
+    def __getitem__(self, index):
+        """
+        The fun at an integer index, or a ChebfunArray for a slice or an array of indices.
+        """
+        if np.ndim(index) == 0 and not isinstance(index, slice):
+            size = self._sizes[index]
+            return self.fun_class.from_coeff(
+                self._coeffs[:size, index], self.domain(), prune=False, vscale=self._vscales[index], tol=self._tol)
+        return type(self)(
+            self._coeffs[:, index], self.domain(), self._vscales[index], self._sizes[index], self._tol)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    # ----------------------------------------------------------------
+    # Evaluation
+    # ----------------------------------------------------------------
+
+    def __call__(self, x):
+        """
+        Values of all the funs at x, computed with the Clenshaw recurrence.
+        Return: array of shape x.shape + (k,)
+        """
+        return self.fun_class.clenshaw(self._coeffs, self._ab_to_ui(np.asarray(x)))
+
+    # ----------------------------------------------------------------
+    # Arithmetic
+    # ----------------------------------------------------------------
+
+    def _operand(self, other):
+        """
+        Coefficient matrix and vscales of the other operand, broadcastable to those of self,
+        and the tolerance of the result; None for unsupported operands.
+        A scalar or a single scalar fun is applied to all the funs.
+        """
+        if np.isscalar(other):
+            return np.array([[other]]), np.abs(other), self._tol
+        if isinstance(other, (ChebfunArray, Polyfun)):
+            if not self.same_domain(other):
+                raise self.DomainMismatch(self.domain(), other.domain())
+            tol = max_tolerance(self, other)
+            if isinstance(other, ChebfunArray):
+                return other.coefficients(), other._vscales, tol
+            coeffs = other.coefficients()
+            if coeffs.ndim != 1:
+                raise TypeError("Only scalar funs may be combined with a ChebfunArray, not funs of shape {}".format(coeffs.shape[1:]))
+            return coeffs[:, np.newaxis], other.vscale(), tol
+        return None
+
+    def __add__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        coeffs, vscales, tol = operand
+        N = max(len(coeffs), self.size())
+        chebsum = np.zeros((N, np.broadcast(self._coeffs[0], coeffs[0]).size),
+                           dtype=np.result_type(self._coeffs, coeffs))
+        chebsum[:self.size()] += self._coeffs
+        chebsum[:len(coeffs)] += coeffs
+        return self.from_coeff(chebsum, self.domain(), vscale=np.maximum(self._vscales, vscales), tol=tol)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return type(self)(-self._coeffs, self.domain(), self._vscales, self._sizes, self._tol)
+
+    def __sub__(self, other):
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return -(self - other)
+
+    def __mul__(self, other):
+        """
+        Multiplication.
+        All the products are computed together at size() + other.size() - 1 Chebyshev points,
+        where they are represented exactly.
+        """
+        operand = self._operand(other)
+        if operand is None:
+            return NotImplemented
+        coeffs, vscales, tol = operand
+        new_vscales = self._vscales * vscales
+        if len(coeffs) == 1:
+            return self.from_coeff(self._coeffs * coeffs[0], self.domain(), vscale=new_vscales, tol=tol)
+        N = self.size() + len(coeffs) - 1
+        values = self._resample(self._coeffs, N) * self._resample(coeffs, N)
+        return self.from_coeff(self.fun_class.polyfit(values), self.domain(), vscale=new_vscales, tol=tol)
+
+    __rmul__ = __mul__
+
+    def _resample(self, coeffs, N):
+        """
+        Values at N Chebyshev points of the series with the given coefficients.
+        """
+        padded = np.zeros((N,) + coeffs.shape[1:], dtype=coeffs.dtype)
+        padded[:len(coeffs)] = coeffs
+        return self.fun_class.polyval(padded)
+
+    # ----------------------------------------------------------------
+    # Integration and differentiation
+    # ----------------------------------------------------------------
+
+    def sum(self):
+        """
+        Integrals of all the funs over the domain, by Clenshaw-Curtis quadrature.
+        Return: array of shape (k,)
+        """
+        ak2 = self._coeffs[::2]
+        Tints = 2/(1-(2*np.arange(len(ak2)))**2)
+        a_, b_ = self.domain()
+        return 0.5*(b_-a_)*np.dot(Tints, ak2)
+
+    def integrate(self):
+        """
+        Primitives of all the funs, starting at zero on the left-hand side of the domain.
+        """
+        a, b = self.domain()
+        int_coeffs = 0.5*(b-a)*poly.chebyshev.chebint(self._coeffs, axis=0)
+        # value at the left-hand side: sum of (-1)^k c_k
+        signs = (-1.)**np.arange(len(int_coeffs))
+        int_coeffs[0] -= np.dot(signs, int_coeffs)
+        return self.from_coeff(int_coeffs, self.domain(), tol=self._tol)
+
+    def differentiate(self, n=1):
+        """
+        n-th derivatives of all the funs, default 1.
+        """
+        ak = self._coeffs
+        a_, b_ = self.domain()
+        for _ in range(n):
+            ak = self.fun_class.differentiator(ak)
+        return self.from_coeff((2./(b_-a_))**n*ak, self.domain(), tol=self._tol)
+
+    diff = differentiate
+    cumsum = integrate
+
+    # ----------------------------------------------------------------
+    # Roots
+    # ----------------------------------------------------------------
+
+    def roots(self, executor=None, workers=None, solver='eig', max_size=None):
+        """
+        Roots of all the funs.
+        The funs are subdivided as in Chebfun.roots, and the pieces of all the funs
+        are then solved together, so that pieces of equal size share one batched eigenvalue call.
+        The arguments are those of Chebfun.roots.
+        Return: list of k sorted arrays of roots
+        """
+        cls = self.fun_class
+        subdivisions = [cls.subdivide(self._coeffs[:size, j], vscale, max_size=max_size, tol=self._tol)
+                        for j, (size, vscale) in enumerate(zip(self._sizes, self._vscales))]
+        coeffs = [piece[0] for pieces in subdivisions for piece in pieces]
+        solutions = cls.batch_roots(coeffs, executor, workers, solver)
+        roots = []
+        start = 0
+        for pieces in subdivisions:
+            stop = start + len(pieces)
+            roots.append(self._ui_to_ab(cls.assemble_roots(pieces, solutions[start:stop])))
+            start = stop
+        return roots
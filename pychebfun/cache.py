@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# coding: UTF-8
+"""
+Cache module
+============
+
+The same few sizes of Chebyshev grids recur in most computations,
+so the arrays which only depend on the size (points, weights) are
+computed once and kept in a bounded, thread-safe LRU cache shared by the process::
+
+    array_cache.stats()   # hits, misses, evictions, size, maxsize
+    array_cache.resize(1024)
+
+The cached arrays are read-only.
+
+Costly functions can also be memoized on disk between processes,
+by passing a DiskCache to Chebfun.from_function::
+
+    disk = DiskCache('/tmp/chebfuns', max_bytes=2**30)
+    f = Chebfun.from_function(model, cache=disk)
+
+"""
+from __future__ import division
+
+import os
+import types
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+class LRUCache(object):
+    """
+    Mapping of bounded size: when it is full, the least recently used item is evicted.
+    All the methods are thread-safe.
+    """
+
+    def __init__(self, maxsize=256):
+        """
+        maxsize: the maximum number of items
+        """
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, compute):
+        """
+        The item for key, computed by compute() and stored if it is not in the cache.
+        compute is called without holding the lock, so two threads may compute the same item;
+        the first one stored is then returned to both.
+        """
+        with self._lock:
+            if key in self._items:
+                self._hits += 1
+                value = self._items.pop(key)
+                self._items[key] = value
+                return value
+            self._misses += 1
+        value = compute()
+        with self._lock:
+            if key in self._items:
+                return self._items[key]
+            self._items[key] = value
+            self._evict()
+        return value
+
+    def _evict(self):
+        while len(self._items) > self._maxsize:
+            self._items.popitem(last=False)
+            self._evictions += 1
+
+    def resize(self, maxsize):
+        """
+        Change the maximum number of items, evicting the least recently used ones if necessary.
+        """
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """
+        Remove all the items and reset the statistics.
+        """
+        with self._lock:
+            self._items.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def stats(self):
+        """
+        Statistics of the cache: dictionary with the numbers of hits, misses and evictions,
+        the current size and the maximum size.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'size': len(self._items),
+                'maxsize': self._maxsize,
+            }
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+# the cache shared by the process
+array_cache = LRUCache()
+
+def cached_array(key, compute):
+    """
+    The array for key in array_cache, computed by compute() if necessary.
+    The array is made read-only, as it is shared.
+    """
+    def compute_read_only():
+        array = compute()
+        array.flags.writeable = False
+        return array
+    return array_cache.get(key, compute_read_only)
+
+class DiskCache(object):
+    """
+    Arrays stored in .npz files in a directory, under hashed keys.
+    The keys of Chebfun.from_function are tuples whose first item is the function key;
+    the files of one function can thus be removed together.
+    When the files take more than max_bytes, the least recently used ones
+    (by modification time, which is updated on each hit) are removed.
+    Several processes may share the directory: the files are written atomically.
+    """
+
+    def __init__(self, directory, max_bytes=2**30):
+        """
+        directory: where to store the files; created if necessary
+        max_bytes: the maximum total size of the files
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def path(self, key):
+        """
+        Path of the file for key, which may be any object with a deterministic repr.
+        The name starts with the hash of the first item of a tuple key, or of the key itself.
+        """
+        group = key[0] if isinstance(key, tuple) else key
+        return os.path.join(self.directory, '{}-{}.npz'.format(_digest(group)[:16], _digest(key)))
+
+    def get(self, key):
+        """
+        Dictionary of the arrays stored for key, or None.
+        """
+        path = self.path(key)
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                arrays = dict((name, stored[name]) for name in stored.files)
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            self._misses += 1
+            return None
+        self._hits += 1
+        return arrays
+
+    def set(self, key, arrays):
+        """
+        Store the dictionary of arrays for key, then evict the old files if necessary.
+        """
+        # the suffix keeps the file being written out of _files(), hence of the evictions
+        handle, temporary = tempfile.mkstemp(suffix='.npz.tmp', dir=self.directory)
+        try:
+            with os.fdopen(handle, 'wb') as stream:
+                np.savez(stream, **arrays)
+            getattr(os, 'replace', os.rename)(temporary, self.path(key))
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        self._evict()
+
+    def invalidate(self, key=None, function=None):
+        """
+        Remove the entry for key, or all the entries of function if given,
+        or all the entries if both are None.
+        function: a function key, or a function whose key is derived by function_key
+        """
+        if key is not None:
+            paths = [self.path(key)]
+        else:
+            paths = [path for path, _, _ in self._files()]
+            if function is not None:
+                if callable(function):
+                    function = function_key(function)
+                prefix = _digest(function)[:16] + '-'
+                paths = [path for path in paths if os.path.basename(path).startswith(prefix)]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _files(self):
+        """
+        List of (path, size, mtime) of the files in the cache.
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except OSError: # removed by another process
+                continue
+            files.append((path, info.st_size, info.st_mtime))
+        return files
+
+    def _evict(self):
+        files = sorted(self._files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            self._evictions += 1
+
+    def stats(self):
+        """
+        Statistics of the cache: dictionary with the numbers of hits, misses and evictions
+        in this process, the number of entries, their total size and the maximum size.
+        """
+        files = self._files()
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'size': len(files),
+            'bytes': sum(size for _, size, _ in files),
+            'max_bytes': self.max_bytes,
+        }
+
+def _digest(obj):
+    return hashlib.sha1(repr(obj).encode('utf-8')).hexdigest()
+
+def _code_digest(code):
+    """
+    Hash of the bytecode and the constants of a code object, and of its nested code objects.
+    """
+    digest = hashlib.sha1(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            const = _code_digest(const)
+        digest.update(repr(const).encode('utf-8'))
+    return digest.hexdigest()
+
+def function_key(f, key=None):
+    """
+    Key identifying the function f in a DiskCache: key if given,
+    otherwise the module, the qualified name and a hash of the code of f,
+    so that the entries are not used any more once f is edited.
+    Only plain functions defined at the top level of a module have such a key:
+    bound methods (which depend on their instance), anonymous functions, closures,
+    and other callables such as numpy ufuncs need a key.
+    """
+    if key is not None:
+        return key
+    name = getattr(f, '__qualname__', getattr(f, '__name__', None))
+    module = getattr(f, '__module__', None)
+    if (not isinstance(f, types.FunctionType) or name is None or module is None
+            or '<lambda>' in name or '<locals>' in name or f.__closure__):
+        raise ValueError("A key is needed to cache {!r}".format(f))
+    return '{}.{}@{}'.format(module, name, _code_digest(f.__code__)[:16])
@@ -15,19 +15,22 @@ from __future__ import division
 import operator
 
 import numpy as np
-from scipy import linalg
 
 from scipy.interpolate import BarycentricInterpolator as Bary
 import numpy.polynomial as poly
-import scipy.fftpack as fftpack
 
-from .polyfun import Polyfun, cast_scalar
+from .polyfun import Polyfun, cast_scalar, parallel_map, evaluate_function, emach
+from .polyfun import set_tolerance, get_tolerance, tolerance, max_tolerance
+from .transform import dct1, even_data
+from .cache import array_cache, cached_array, DiskCache
 
 class Chebfun(Polyfun):
     """
     Eventually set this up so that a Chebfun is a collection of Chebfuns. This 
     will enable piecewise smooth representations al la Matlab Chebfun v2.0.  
     """
+    __slots__ = ()
+
     # ----------------------------------------------------------------
     # Standard construction class methods.
     # ----------------------------------------------------------------
@@ -66,11 +69,8 @@ class Chebfun(Polyfun):
         Evaluate the integral over the given interval using
         Clenshaw-Curtis quadrature.
         """
-        ak = self.coefficients()
-        ak2 = ak[::2]
-        n = len(ak2)
-        Tints = 2/(1-(2*np.arange(n))**2)
-        val = np.sum((Tints*ak2.T).T, axis=0)
+        weights = self.quadrature_weights(self.size())
+        val = np.dot(weights, self.values())
         a_, b_ = self.domain()
         return 0.5*(b_-a_)*val
 
@@ -82,7 +82,7 @@ class Chebfun(Polyfun):
         coeffs = self.coefficients()
         a,b = self.domain()
         int_coeffs = 0.5*(b-a)*poly.chebyshev.chebint(coeffs)
-        antiderivative = self.from_coeff(int_coeffs,domain=self.domain()) 
+        antiderivative = self.from_coeff(int_coeffs,domain=self.domain(),tol=self._tol) 
         return antiderivative - antiderivative(a)
 
     def differentiate(self, n=1):
@@ -93,46 +93,334 @@ class Chebfun(Polyfun):
         a_, b_ = self.domain()
         for _ in range(n):
             ak = self.differentiator(ak)
-        return self.from_coeff((2./(b_-a_))**n*ak,domain=self.domain())
+        return self.from_coeff((2./(b_-a_))**n*ak,domain=self.domain(),tol=self._tol)
         
     # ----------------------------------------------------------------
     # Roots 
     # ----------------------------------------------------------------
-    def roots(self):
+    def roots(self, executor=None, workers=None, solver='eig', max_size=None):
         """
         Utilises Boyd's O(n^2) recursive subdivision algorithm. The chebfun
         is recursively subsampled until it is successfully represented to 
         machine precision by a sequence of piecewise interpolants of degree
-        100 or less. A colleague matrix eigenvalue solve is then applied to 
+        max_size or less. A root-finder is then applied to 
         each of these pieces and the results are concatenated.
+        The pieces are computed from the coefficients of their parent,
+        and pieces which cannot vanish are discarded.
+
+        executor: an executor (for instance from concurrent.futures) on which
+        the pieces are solved concurrently
+        workers: if no executor is given, number of threads to use
+        solver: 'eig' for the eigenvalues of the colleague matrix (O(n^3) per piece),
+        or 'aberth' for the Ehrlich-Aberth iteration (O(n^2) per piece, O(n) memory)
+        max_size: size of the pieces below which no subdivision is done;
+        defaults to max_root_size. Larger pieces mean fewer splits,
+        and are best combined with the 'aberth' solver.
+        Return: the sorted roots
         
         See: 
         J. P. Boyd, Computing zeros on a real interval through Chebyshev 
         expansion and polynomial rootfinding, SIAM J. Numer. Anal., 40 (2002), 
         pp. 1666–1682.
         """
-        if self.size() <= 100:  
-            ak = self.coefficients()
-            v = np.zeros_like(ak[:-1])
-            v[1] = 0.5
-            C1 = linalg.toeplitz(v) 
-            C2 = np.zeros_like(C1)
-            C1[0,1] = 1.
-            C2[-1,:] = ak[:-1]
-            C = C1 - .5/ak[-1] * C2
-            eigenvalues = linalg.eigvals(C) 
-            roots = [eig.real for eig in eigenvalues
-                    if np.allclose(eig.imag,0,atol=1e-10) 
-                        and np.abs(eig.real) <=1]
-            scaled_roots = self._ui_to_ab(np.array(roots))
-            return scaled_roots
+        roots = self.subdivision_roots(self.coefficients(), self.vscale(), executor, workers, solver, max_size, self._tol)
+        return self._ui_to_ab(roots)
+
+    # divide at a close-to-zero split-point
+    split_point = 0.0123456789
+
+    # default maximal size of the pieces on which the root-finder is used
+    max_root_size = 100
+
+    @classmethod
+    def subdivide(self, chebcoeff, vscale=1., subinterval=(-1., 1.), max_size=None, tol=None):
+        """
+        Recursively split a Chebyshev series until the pieces are small enough
+        for the root-finder.
+        vscale: the scale used to prune the coefficients of the pieces
+        max_size: maximal size of the pieces; defaults to max_root_size
+        tol: the tolerance used to prune the coefficients of the pieces
+        Return: list of (coefficients, subinterval) from left to right,
+        without the pieces which cannot vanish
+        """
+        if max_size is None:
+            max_size = self.max_root_size
+        if len(chebcoeff) <= max_size:
+            return [(chebcoeff, subinterval)]
+        a, b = subinterval
+        split = 0.5*(b-a)*self.split_point + 0.5*(a+b)
+        pieces = []
+        for lo, hi in [(-1., self.split_point), (self.split_point, 1.)]:
+            coeffs = self.restrict_coefficients(chebcoeff, [lo, hi])
+            coeffs = coeffs[:self._cutoff(coeffs, vscale, tol)]
+            if self.has_no_roots(coeffs):
+                continue
+            sub = (a, split) if lo == -1. else (split, b)
+            pieces.extend(self.subdivide(coeffs, vscale, sub, max_size, tol))
+        return pieces
+
+    @classmethod
+    def subdivision_roots(self, chebcoeff, vscale=1., executor=None, workers=None, solver='eig', max_size=None, tol=None):
+        """
+        Sorted roots in [-1,1] of a Chebyshev series, by recursive subdivision.
+        The root-finding problems of the pieces are independent, and are
+        solved on the executor if one is given (LAPACK releases the GIL).
+        vscale: the scale used to prune the coefficients of the pieces
+        workers: if no executor is given, number of threads to use
+        solver: 'eig' or 'aberth' (see batch_roots)
+        max_size: maximal size of the pieces; defaults to max_root_size
+        tol: the tolerance used to prune the coefficients of the pieces
+        """
+        pieces = self.subdivide(chebcoeff, vscale, max_size=max_size, tol=tol)
+        coeffs = [piece[0] for piece in pieces]
+        solutions = self.batch_roots(coeffs, executor, workers, solver)
+        return self.assemble_roots(pieces, solutions)
+
+    @classmethod
+    def assemble_roots(self, pieces, solutions):
+        """
+        Sorted roots in [-1,1] from the roots of the pieces of a subdivision.
+        pieces: list of (coefficients, subinterval), as returned by subdivide
+        solutions: list of the roots in [-1,1] of each piece
+        """
+        roots = [0.5*(b-a)*r + 0.5*(a+b) for r, (c, (a, b)) in zip(solutions, pieces)]
+        if not roots:
+            return np.array([])
+        roots = np.sort(np.concatenate(roots))
+        # a root at a split point may be found in both adjacent pieces
+        splits = [left[1][1] for left, right in zip(pieces[:-1], pieces[1:])
+                  if left[1][1] == right[1][0]]
+        return self._remove_duplicates(roots, splits)
+
+    @classmethod
+    def _remove_duplicates(self, roots, splits, tol=1e-12):
+        """
+        Keep only one root among the sorted roots close to each split point.
+        """
+        if not len(splits) or len(roots) < 2:
+            return roots
+        close = np.abs(roots[:,np.newaxis] - np.array(splits)) < tol
+        near_split = np.any(close, axis=1)
+        duplicate = np.zeros(len(roots), dtype=bool)
+        duplicate[1:] = near_split[1:] & near_split[:-1] & (np.diff(roots) < 2*tol)
+        return roots[~duplicate]
+
+    @classmethod
+    def has_no_roots(self, chebcoeff):
+        """
+        Whether the series is certain not to vanish on [-1,1],
+        that is, when |c_0| > |c_1| + |c_2| + ...
+        """
+        ak = np.abs(chebcoeff)
+        return ak[0] > np.sum(ak[1:])
+
+    @classmethod
+    def colleague_roots(self, chebcoeff):
+        """
+        Real roots in [-1,1] of a Chebyshev series, computed as the eigenvalues
+        of the colleague matrix.
+        """
+        return self.batch_roots([chebcoeff])[0]
+
+    @classmethod
+    def batch_roots(self, chebcoeffs, executor=None, workers=None, solver='eig'):
+        """
+        Real roots in [-1,1] of many Chebyshev series.
+        With the 'eig' solver, the series of equal size are solved together: their colleague
+        matrices are stacked in a 3-D array, and their eigenvalues are computed by one batched call.
+        With the 'aberth' solver, each series is solved by aberth_roots.
+        chebcoeffs: list of coefficient arrays, or 2-D array with one series per row
+        executor: executor on which the groups of equal size are solved concurrently
+        workers: if no executor is given, number of threads to use
+        Return: list of arrays of roots, one for each series
+        """
+        if solver not in self.root_solvers:
+            raise ValueError("Unknown solver '{}'".format(solver))
+        groups = {}
+        for index, coeffs in enumerate(chebcoeffs):
+            # trailing zeros do not change the series
+            nonzero = np.flatnonzero(coeffs)
+            size = nonzero[-1] + 1 if len(nonzero) else 0
+            if size > 1: # constants have no roots
+                groups.setdefault(size, []).append(index)
+        sizes = sorted(groups)
+        roots = [np.array([])]*len(chebcoeffs)
+        if solver == 'aberth':
+            indices = [index for size in sizes for index in groups[size]]
+            series = [chebcoeffs[index] for index in indices]
+            for index, index_roots in zip(indices, parallel_map(self.aberth_roots, series, executor, workers)):
+                roots[index] = index_roots
+            return roots
+        stacks = [np.array([chebcoeffs[index][:size] for index in groups[size]]) for size in sizes]
+        solutions = parallel_map(self.stacked_roots, stacks, executor, workers)
+        for size, group_roots in zip(sizes, solutions):
+            for index, index_roots in zip(groups[size], group_roots):
+                roots[index] = index_roots
+        return roots
+
+    root_solvers = ('eig', 'aberth')
+
+    # number of successive projections on the ellipse after which an Aberth iterate stops
+    aberth_projections = 5
+
+    @classmethod
+    def stacked_roots(self, chebcoeffs):
+        """
+        Real roots in [-1,1] of k Chebyshev series of the same size n,
+        from the eigenvalues of their stacked colleague matrices.
+        chebcoeffs: array of shape (k, n), with nonzero last coefficients
+        Return: list of k arrays of roots
+        """
+        eigenvalues = np.linalg.eigvals(self.colleague_matrices(chebcoeffs))
+        is_root = (np.abs(eigenvalues.imag) <= 1e-10) & (np.abs(eigenvalues.real) <= 1)
+        counts = np.sum(is_root, axis=1)
+        roots = eigenvalues.real[is_root]
+        return np.split(roots, np.cumsum(counts)[:-1])
+
+    @classmethod
+    def aberth_roots(self, chebcoeff, maxiter=100):
+        """
+        Real roots in [-1,1] of a Chebyshev series, computed by the Ehrlich-Aberth
+        simultaneous iteration on all its complex roots.
+        The series and its derivative are evaluated with the Clenshaw recurrence,
+        so that each iteration costs O(n^2) operations and O(n) memory,
+        instead of the O(n^3) operations and O(n^2) memory of the colleague matrix.
+        An iterate stops when its step is negligible, when the series is below
+        its rounding error there and the steps no longer decrease, or when it has been
+        projected back on the ellipse of the wanted roots aberth_projections times in a row.
+        Falls back on the colleague matrix if the iteration breaks down,
+        or if some iterates have not converged after maxiter iterations.
+
+        See:
+        D. A. Bini, Numerical computation of polynomial zeros by means of
+        Aberth's method, Numer. Algorithms, 13 (1996), pp. 179–200.
+        """
+        coeffs = np.asarray(chebcoeff)
+        nonzero = np.flatnonzero(coeffs)
+        degree = nonzero[-1] if len(nonzero) else 0
+        if degree < 1:
+            return np.array([])
+        coeffs = coeffs[:degree+1]/coeffs[degree]
+        # the series and its derivative, evaluated together
+        both = np.zeros((degree+1, 2), dtype=coeffs.dtype)
+        both[:, 0] = coeffs
+        derivative = self.differentiator(coeffs)
+        both[:len(derivative), 1] = derivative
+        abscoeffs = np.abs(coeffs)
+        # the iterates are kept inside a Bernstein ellipse on which the series
+        # and its derivative cannot overflow; the roots beyond it are not wanted
+        max_rho = np.exp(min(1., (500. - np.log(np.sum(abscoeffs)*degree**2))/degree))
+        # initial guesses on a Bernstein ellipse, not symmetric about the real axis
+        z = self._from_ellipse(1.01*np.exp(2j*np.pi*(np.arange(degree) + .25)/degree))
+        active = np.arange(degree)
+        moves = np.full(degree, np.inf)
+        projected = np.zeros(degree, dtype=int)
+        with np.errstate(all='ignore'):
+            for iteration in range(maxiter):
+                za = z[active]
+                values, derivatives = self.clenshaw(both, za).T
+                bound = np.sqrt(degree)*emach*self._rounding_bounds(abscoeffs, za)
+                # Newton step corrected by the repulsion of the other roots
+                step = values/(derivatives - values*self._aberth_sums(z, active))
+                step[~np.isfinite(step)] = 0.
+                moved = za - step
+                w = self._to_ellipse(moved)
+                far = np.abs(w) > max_rho
+                moved[far] = self._from_ellipse(w[far]*max_rho/np.abs(w[far]))
+                z[active] = moved
+                # an iterate projected on the ellipse may come back, so it is kept for a while
+                projected[active] = np.where(far, projected[active] + 1, 0)
+                move = np.abs(moved - za)
+                negligible = move <= 16*emach*np.maximum(np.abs(za), 1.)
+                stalled = (np.abs(values) <= bound) & (move > .5*moves[active])
+                moves[active] = move
+                active = active[~negligible & ~stalled & (projected[active] < self.aberth_projections)]
+                if not len(active):
+                    break
+        if len(active) or not np.all(np.isfinite(z)):
+            return self.stacked_roots(coeffs[np.newaxis])[0]
+        return np.sort(z.real[(np.abs(z.imag) <= 1e-10) & (np.abs(z.real) <= 1)])
+
+    @classmethod
+    def _rounding_bounds(self, abscoeffs, z):
+        """
+        The sums of |c_k T_k(z)|, which bound the rounding errors
+        on the value of the series at the points z.
+        """
+        previous, current = np.ones_like(z), z
+        bounds = abscoeffs[0] + abscoeffs[1]*np.abs(z)
+        for ak in abscoeffs[2:]:
+            previous, current = current, 2*z*current - previous
+            bounds += ak*np.abs(current)
+        return bounds
+
+    @classmethod
+    def _to_ellipse(self, z):
+        """
+        The point w with |w| >= 1 such that z = (w + 1/w)/2;
+        z is on the Bernstein ellipse of parameter |w|.
+        """
+        w = z + np.sqrt(z-1)*np.sqrt(z+1)
+        inside = np.abs(w) < 1
+        w[inside] = 1/w[inside]
+        return w
+
+    @classmethod
+    def _from_ellipse(self, w):
+        return .5*(w + 1/w)
+
+    @classmethod
+    def _aberth_sums(self, z, rows, chunk_size=2**16):
+        """
+        The sums of 1/(z_i - z_j) over j != i, for i in rows.
+        The pairwise differences are computed by blocks of at most chunk_size entries.
+        """
+        sums = np.empty(len(rows), dtype=complex)
+        block = max(1, chunk_size//len(z))
+        for start in range(0, len(rows), block):
+            index = rows[start:start+block]
+            differences = z[index, np.newaxis] - z
+            differences[np.arange(len(index)), index] = np.inf
+            sums[start:start+block] = np.sum(1/differences, axis=1)
+        return sums
+
+    @classmethod
+    def colleague_matrices(self, chebcoeffs):
+        """
+        Colleague matrices of k Chebyshev series of the same size n >= 2.
+        The eigenvalues of the colleague matrix are the roots of the series.
+        chebcoeffs: array of shape (k, n), with nonzero last coefficients
+        Return: array of shape (k, n-1, n-1)
+        """
+        ak = np.asarray(chebcoeffs)
+        k, n = ak.shape
+        m = n-1
+        C = np.zeros((k, m, m), dtype=np.result_type(ak, 1.))
+        if m > 1:
+            # x T_0 = T_1, x T_j = (T_{j+1} + T_{j-1})/2
+            i = np.arange(m-1)
+            C[:, i, i+1] = .5
+            C[:, i+1, i] = .5
+            C[:, 0, 1] = 1.
+            factor = .5
         else:
-            # divide at a close-to-zero split-point
-            split_point = self._ui_to_ab(0.0123456789)     
-            return np.concatenate(
-                (self.restrict([self._domain[0],split_point]).roots(),
-                 self.restrict([split_point,self._domain[1]]).roots())
-            )
+            factor = 1.
+        # T_{n-1} = -(a_0 T_0 + ... + a_{n-2} T_{n-2})/a_{n-1}
+        C[:, -1, :] -= factor * ak[:, :-1] / ak[:, -1:]
+        return C
+
+    @classmethod
+    def restrict_coefficients(self, chebcoeff, subinterval):
+        """
+        Coefficients of the restriction of a Chebyshev series to a subinterval of [-1,1].
+        The restriction has the same degree, so it is computed exactly,
+        without any adaptive sampling, from the values of the series at
+        the Chebyshev points of the subinterval.
+        """
+        lo, hi = subinterval
+        N = len(chebcoeff)
+        t = 0.5*(hi-lo)*self.interpolation_points(N) + 0.5*(hi+lo)
+        return self.polyfit(self.clenshaw(chebcoeff, t))
 
     # ----------------------------------------------------------------
     # Interpolation and evaluation (go from values to coefficients)
@@ -141,56 +429,129 @@ class Chebfun(Polyfun):
     @classmethod
     def interpolation_points(self, N):
         """
-        N Chebyshev points in [-1, 1], boundaries included
+        N Chebyshev points in [-1, 1], boundaries included.
+        The returned array is cached, shared and read-only.
         """
         if N == 1:
-            return np.array([0.])
-        return np.cos(np.arange(N)*np.pi/(N-1))
+            return cached_array(('chebyshev points', N), lambda: np.array([0.]))
+        return cached_array(('chebyshev points', N), lambda: np.cos(np.arange(N)*np.pi/(N-1)))
 
     @classmethod
-    def sample_function(self, f, N):
+    def barycentric_weights(self, N):
+        """
+        Weights of the barycentric formula at N Chebyshev points (cached and read-only).
+        """
+        def compute():
+            weights = np.ones(N)
+            weights[0] = .5
+            weights[1::2] = -1
+            weights[-1] *= .5
+            return weights
+        return cached_array(('barycentric weights', N), compute)
+
+    @classmethod
+    def quadrature_weights(self, N):
+        """
+        Clenshaw-Curtis weights at N Chebyshev points, such that the integral over [-1,1]
+        of the interpolant of values is quadrature_weights(N).dot(values) (cached and read-only).
+        """
+        def compute():
+            if N == 1:
+                return np.array([2.])
+            # integrals of the even Chebyshev polynomials, mapped back to the values
+            integrals = np.zeros(N)
+            k = np.arange(0, N, 2)
+            integrals[k] = 2/(1-k**2)
+            weights = dct1(integrals)/(N-1)
+            weights[0] /= 2.
+            weights[-1] /= 2.
+            return weights
+        return cached_array(('quadrature weights', N), compute)
+
+    @classmethod
+    def sample_function(self, f, N, vectorized=True, executor=None, chunksize=None):
         """
         Sample a function on N+1 Chebyshev points.
+        vectorized, executor, chunksize: how to evaluate f (see evaluate_function)
         """
         x = self.interpolation_points(N+1)
-        return f(x)
+        return evaluate_function(f, x, vectorized, executor, chunksize)
 
     @classmethod
-    def polyfit(self, sampled):
+    def refine_samples(self, f, sampled, vectorized=True, executor=None, chunksize=None):
+        """
+        Sample a function on the Chebyshev grid twice as fine as that of sampled.
+        Only the new points are evaluated: the points of sampled are the even points of the finer grid.
+        sampled: array of samples on N+1 Chebyshev points
+        vectorized, executor, chunksize: how to evaluate f (see evaluate_function)
+        """
+        asampled = np.asarray(sampled)
+        N = len(asampled) - 1
+        x = self.interpolation_points(2*N+1)[1::2]
+        new = np.asarray(evaluate_function(f, x, vectorized, executor, chunksize))
+        shape = (2*N+1,) + np.shape(new)[1:]
+        refined = np.empty(shape, dtype=np.result_type(asampled, new))
+        refined[::2] = asampled
+        refined[1::2] = new
+        return refined
+
+    @classmethod
+    def polyfit(self, sampled, workers=None):
         """
         Compute Chebyshev coefficients for values located on Chebyshev points.
         sampled: array; first dimension is number of Chebyshev points
+        workers: number of threads used by the transform
         """
         asampled = np.asarray(sampled)
-        if len(asampled) == 1:
+        N = len(asampled)
+        if N == 1:
             return asampled
-        evened = even_data(asampled)
-        coeffs = dct(evened)
+        coeffs = dct1(asampled, workers)/(N-1)
+        coeffs[0] /= 2.
+        coeffs[-1] /= 2.
         return coeffs
 
     @classmethod
-    def polyval(self, chebcoeff):
+    def polyval(self, chebcoeff, workers=None):
         """
         Compute the interpolation values at Chebyshev points.
         chebcoeff: Chebyshev coefficients
+        workers: number of threads used by the transform
         """
         N = len(chebcoeff)
         if N == 1:
             return chebcoeff
 
-        data = even_data(chebcoeff)/2
+        data = np.asarray(chebcoeff)/2
         data[0] *= 2
         data[N-1] *= 2
 
-        fftdata = 2*(N-1)*fftpack.ifft(data, axis=0)
-        complex_values = fftdata[:N]
-        # convert to real if input was real
-        if np.isrealobj(chebcoeff):
-            values = np.real(complex_values)
-        else:
-            values = complex_values
+        values = dct1(data, workers)
         return values
 
+    @classmethod
+    def clenshaw(self, chebcoeff, t):
+        """
+        Evaluate a Chebyshev series at the points t in [-1, 1] with the Clenshaw recurrence.
+        chebcoeff: Chebyshev coefficients; first dimension is the number of coefficients
+        Return: array of shape t.shape + chebcoeff.shape[1:]
+        """
+        coeffs = np.asarray(chebcoeff)
+        t = np.asarray(t)
+        t = t.reshape(t.shape + (1,)*(coeffs.ndim-1))
+        shape = np.broadcast(t, coeffs[0]).shape
+        dtype = np.result_type(t, coeffs)
+        b1 = np.zeros(shape, dtype=dtype)
+        b2 = np.zeros(shape, dtype=dtype)
+        t2 = 2*t
+        for k in range(len(coeffs)-1, 0, -1):
+            # b_k = c_k + 2t b_{k+1} - b_{k+2}
+            bk = t2*b1
+            bk -= b2
+            bk += coeffs[k]
+            b1, b2 = bk, b1
+        return coeffs[0] + t*b1 - b2
+
     @classmethod
     def interpolator(self, x, values):
         """
@@ -198,12 +559,7 @@ class Chebfun(Polyfun):
         """
         # hacking the barycentric interpolator by computing the weights in advance
         p = Bary([0.])
-        N = len(values)
-        weights = np.ones(N)
-        weights[0] = .5
-        weights[1::2] = -1
-        weights[-1] *= .5
-        p.wi = weights
+        p.wi = self.barycentric_weights(len(values))
         p.xi = x
         p.set_yi(values)
         return p
@@ -238,29 +594,12 @@ class Chebfun(Polyfun):
 # General utilities
 # ----------------------------------------------------------------
             
-def even_data(data):
-    """
-    Construct Extended Data Vector (equivalent to creating an
-    even extension of the original function)
-    Return: array of length 2(N-1)
-    For instance, [0,1,2,3,4] --> [0,1,2,3,4,3,2,1]
-    """
-    return np.concatenate([data, data[-2:0:-1]],)
-
 def dct(data):
     """
-    Compute DCT using FFT
+    Compute the Chebyshev coefficients from the extended data vector (see even_data)
     """
     N = len(data)//2
-    fftdata     = fftpack.fft(data, axis=0)[:N+1]
-    fftdata     /= N
-    fftdata[0]  /= 2.
-    fftdata[-1] /= 2.
-    if np.isrealobj(data):
-        data = np.real(fftdata)
-    else:
-        data = fftdata
-    return data
+    return Chebfun.polyfit(data[:N+1])
 
 # ----------------------------------------------------------------
 # Add overloaded operators
@@ -271,7 +610,7 @@ def _add_operator(cls, op):
         if not self.same_domain(other):
             raise self.DomainMismatch(self.domain(),other.domain())
         return self.from_function(
-            lambda x: op(self(x).T, other(x).T).T, domain=self.domain(),)
+            lambda x: op(self(x).T, other(x).T).T, domain=self.domain(), tol=max_tolerance(self, other))
     cast_method = cast_scalar(method)
     name = '__'+op.__name__+'__'
     cast_method.__name__ = name
@@ -281,7 +620,7 @@ def _add_operator(cls, op):
 def rdiv(a, b):
     return b/a
 
-for _op in [operator.mul, operator.truediv, operator.pow, rdiv]:
+for _op in [operator.truediv, operator.pow, rdiv]:
     _add_operator(Polyfun, _op)
 
 # ----------------------------------------------------------------
@@ -290,7 +629,7 @@ for _op in [operator.mul, operator.truediv, operator.pow, rdiv]:
 
 def _add_delegate(ufunc, nonlinear=True):
     def method(self):
-        return self.from_function(lambda x: ufunc(self(x)), domain=self.domain())
+        return self.from_function(lambda x: ufunc(self(x)), domain=self.domain(), tol=self._tol)
     name = ufunc.__name__
     method.__name__ = name
     method.__doc__ = "delegate for numpy's ufunc {}".format(name)
@@ -298,7 +637,9 @@ def _add_delegate(ufunc, nonlinear=True):
 
 # Following list generated from:
 # https://github.com/numpy/numpy/blob/master/numpy/core/code_generators/generate_umath.py
-for func in [np.arccos, np.arccosh, np.arcsin, np.arcsinh, np.arctan, np.arctanh, np.cos, np.sin, np.tan, np.cosh, np.sinh, np.tanh, np.exp, np.exp2, np.expm1, np.log, np.log2, np.log1p, np.sqrt, np.ceil, np.trunc, np.fabs, np.floor, ]:
+delegated_ufuncs = [np.arccos, np.arccosh, np.arcsin, np.arcsinh, np.arctan, np.arctanh, np.cos, np.sin, np.tan, np.cosh, np.sinh, np.tanh, np.exp, np.exp2, np.expm1, np.log, np.log2, np.log1p, np.sqrt, np.ceil, np.trunc, np.fabs, np.floor, ]
+
+for func in delegated_ufuncs:
     _add_delegate(func)
 
 
@@ -311,18 +652,28 @@ for func in [np.arccos, np.arccosh, np.arcsin, np.arcsinh, np.arctan, np.arctanh
 # Constructor inspired by the Matlab version
 # ----------------------------------------------------------------
 
-def chebfun(f=None, domain=[-1,1], N=None, chebcoeff=None,):
+def chebfun(f=None, domain=[-1,1], N=None, chebcoeff=None, chop='classic', tol=None, max_evals=None, time_limit=None, start=None, cache=None, key=None, vectorized=True, executor=None, refinable=False):
     """
     Create a Chebyshev polynomial approximation of the function $f$ on the interval :math:`[-1, 1]`.
     
     :param callable f: Python, Numpy, or Sage function
     :param int N: (default = None)  specify number of interpolating points
     :param np.array chebcoeff: (default = np.array(0)) specify the coefficients
+    :param str chop: (default = 'classic') chopping rule for a function, 'classic' or 'plateau'
+    :param float tol: (default = None) relative tolerance; defaults to get_tolerance()
+    :param int max_evals: (default = None) maximum number of evaluations of a function
+    :param float time_limit: (default = None) time limit in seconds for the construction from a function
+    :param start: (default = None) a similar chebfun, or its size, to start the construction from a function
+    :param DiskCache cache: (default = None) disk cache in which to store the chebfun of a function
+    :param key: (default = None) key of the function in the cache
+    :param bool vectorized: (default = True) whether the function accepts arrays; otherwise it is called on each point
+    :param executor: (default = None) executor (thread or process pool) on which to evaluate the function
+    :param bool refinable: (default = False) whether the chebfun of a function keeps it, so that it can be refined
     """
 
     # Chebyshev coefficients
     if chebcoeff is not None:
-        return Chebfun.from_coeff(chebcoeff,domain)
+        return Chebfun.from_coeff(chebcoeff,domain,tol=tol)
 
     # another instance
     if isinstance(f, Polyfun):
@@ -330,7 +681,8 @@ def chebfun(f=None, domain=[-1,1], N=None, chebcoeff=None,):
 
     # callable
     if hasattr(f, '__call__'):
-        return Chebfun.from_function(f, domain, N)
+        return Chebfun.from_function(f, domain, N, chop, tol, max_evals, time_limit, start, cache, key,
+                                     vectorized, executor, refinable=refinable)
 
     # from here on, assume that f is None, or iterable
     if np.isscalar(f):
@@ -341,7 +693,7 @@ def chebfun(f=None, domain=[-1,1], N=None, chebcoeff=None,):
     except TypeError:
         pass
     else:
-        return Chebfun(f,domain)
+        return Chebfun(f,domain,tol=tol)
 
     raise TypeError('Impossible to initialise the object from an object of type {}'.format(type(f)))
 
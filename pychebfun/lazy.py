@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# coding: UTF-8
+"""
+Lazy module
+===========
+
+Arithmetic and ufuncs on lazy expressions record an expression graph
+instead of constructing a new fun at each step.
+The graph is turned into a fun by a single adaptive construction,
+which evaluates the whole expression at once on the Chebyshev points::
+
+    x = Chebfun.identity().lazy()
+    e = np.tan(x+1/4) + np.cos(10*x**2 + np.exp(np.exp(x)))
+    f = e.chebfun()
+
+Identical subexpressions are represented by the same node,
+and are thus only evaluated once.
+
+"""
+from __future__ import division
+
+import operator
+import weakref
+
+import numpy as np
+
+from .polyfun import Polyfun, max_tolerance
+from .chebfun import delegated_ufuncs
+
+class Expression(object):
+    """
+    Node of an expression graph.
+    Nodes are either leaves (a fun or a constant) or the application
+    of an operation to other nodes.
+    Nodes are unique: building twice the same expression returns the same node.
+    """
+
+    # all the living nodes, indexed by their key
+    _nodes = weakref.WeakValueDictionary()
+
+    @classmethod
+    def _get(self, key, op, args, value, domain):
+        """
+        Return the node with the given key, creating it if necessary.
+        """
+        node = self._nodes.get(key)
+        if node is None:
+            node = self(op, args, value, domain)
+            self._nodes[key] = node
+        return node
+
+    @classmethod
+    def from_fun(self, fun):
+        """
+        Leaf node for a fun.
+        """
+        return self._get(('fun', id(fun)), None, (), fun, fun.domain())
+
+    @classmethod
+    def constant(self, value):
+        """
+        Leaf node for a scalar.
+        The key holds the bytes of the value, as == would mix 0. and -0. and never match nan.
+        """
+        return self._get(('constant', type(value), np.asarray(value).tobytes()), None, (), value, None)
+
+    @classmethod
+    def apply(self, op, *args):
+        """
+        Node for the operation op on the nodes args.
+        """
+        domains = [arg._domain for arg in args if arg._domain is not None]
+        for domain in domains[1:]:
+            if not np.allclose(domain, domains[0], rtol=1e-14, atol=1e-14):
+                raise Polyfun.DomainMismatch(domains[0], domain)
+        if domains:
+            domain = domains[0]
+        else:
+            domain = None
+        key = (op,) + tuple(id(arg) for arg in args)
+        return self._get(key, op, args, None, domain)
+
+    def __init__(self, op, args, value, domain):
+        """
+        op: operation applied to the values of args, or None for a leaf
+        value: the fun or the constant of a leaf
+        """
+        self._op = op
+        self._args = args
+        self._value = value
+        self._domain = domain
+        self._fun = None
+
+    def domain(self):
+        return self._domain
+
+    def leaves(self):
+        """
+        The funs at the leaves of the expression.
+        """
+        return [node._value for node in self._nodes_in_order()
+                if node._op is None and isinstance(node._value, Polyfun)]
+
+    def _nodes_in_order(self):
+        """
+        The nodes of the graph, each node coming after its arguments.
+        """
+        ordered = []
+        visited = set()
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                ordered.append(node)
+                continue
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            stack.append((node, True))
+            for arg in reversed(node._args):
+                if id(arg) not in visited:
+                    stack.append((arg, False))
+        return ordered
+
+    def __call__(self, x):
+        """
+        Evaluate the whole expression at x.
+        """
+        values = {}
+        for node in self._nodes_in_order():
+            if node._op is None:
+                if isinstance(node._value, Polyfun):
+                    value = node._value(x)
+                else:
+                    value = node._value
+            else:
+                args = [values[id(arg)] for arg in node._args]
+                value = node._op(*[np.transpose(arg) for arg in args]).T
+            values[id(node)] = value
+        return values[id(self)]
+
+    def chebfun(self):
+        """
+        The fun represented by the expression, computed by one adaptive construction,
+        with the largest tolerance of the funs of the expression.
+        """
+        if self._fun is None:
+            if self._op is None and isinstance(self._value, Polyfun):
+                self._fun = self._value
+            else:
+                leaves = self.leaves()
+                if not leaves:
+                    raise ValueError("The expression does not depend on any fun")
+                cls = type(leaves[0])
+                self._fun = cls.from_function(self, domain=self._domain, tol=max_tolerance(*leaves))
+        return self._fun
+
+    def __neg__(self):
+        return self.apply(operator.neg, self)
+
+    def __abs__(self):
+        return self.apply(operator.abs, self)
+
+    def __pos__(self):
+        return self
+
+# ----------------------------------------------------------------
+# Add overloaded operators
+# ----------------------------------------------------------------
+
+def as_expression(other):
+    """
+    Convert funs and scalars to expressions; return None for other objects.
+    """
+    if isinstance(other, Expression):
+        return other
+    if isinstance(other, Polyfun):
+        return Expression.from_fun(other)
+    if np.isscalar(other):
+        return Expression.constant(other)
+    return None
+
+def _add_operator(op, name, reflected):
+    def method(self, other):
+        other = as_expression(other)
+        if other is None:
+            return NotImplemented
+        if reflected:
+            return self.apply(op, other, self)
+        return self.apply(op, self, other)
+    method.__name__ = name
+    method.__doc__ = "operator {}".format(name)
+    setattr(Expression, name, method)
+
+for _op in [operator.add, operator.sub, operator.mul, operator.truediv, operator.pow]:
+    _name = _op.__name__
+    _add_operator(_op, '__{}__'.format(_name), reflected=False)
+    _add_operator(_op, '__r{}__'.format(_name), reflected=True)
+
+Expression.__div__ = Expression.__truediv__
+Expression.__rdiv__ = Expression.__rtruediv__
+
+# ----------------------------------------------------------------
+# Add numpy ufunc delegates
+# ----------------------------------------------------------------
+
+def _add_delegate(ufunc):
+    def method(self):
+        return self.apply(ufunc, self)
+    name = ufunc.__name__
+    method.__name__ = name
+    method.__doc__ = "lazy delegate for numpy's ufunc {}".format(name)
+    setattr(Expression, name, method)
+
+for func in delegated_ufuncs:
+    _add_delegate(func)
+
+# ----------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------
+
+def lazy(fun):
+    """
+    Lazy expression for the fun: operations on it are recorded
+    and only computed when calling chebfun() on the result.
+    """
+    return Expression.from_fun(fun)
+
+Polyfun.lazy = lazy
+Polyfun._deferred_operands += (Expression,)
@@ -92,8 +92,7 @@ def plot_data(poly, resolution):
     """
     Plot data depending on the dimension of the fun.
     """
-    ts = get_linspace(poly.domain(), resolution)
-    values = poly(ts)
+    ts, values = poly.sample_uniform(resolution)
     dim, dof = dimension_info(poly)
     if 1 == dim and 1 == dof: # 1D real
         xs = ts
@@ -154,8 +153,7 @@ def compare(poly, f, *args, **kwds):
 
         -- f: Python, Numpy, or Sage function
     """
-    a, b = poly.domain()
-    x = np.linspace(a, b, 10000)
+    x, values = poly.sample_uniform(10000)
     fig = plt.figure()
     ax = fig.add_subplot(211)
     
@@ -165,7 +163,7 @@ def compare(poly, f, *args, **kwds):
     ax.legend(loc='best')
 
     ax  = fig.add_subplot(212)
-    ax.plot(x, abs(f(x)-poly(x)), 'k')
+    ax.plot(x, abs(f(x)-values), 'k')
 
     return ax
 
@@ -9,15 +9,202 @@ import sys
 emach = sys.float_info.epsilon                        # machine epsilon
 
 from functools import wraps
+from multiprocessing import cpu_count
+from contextlib import contextmanager
+from timeit import default_timer
+
+from .cache import function_key
+
+# ----------------------------------------------------------------
+# Tolerance
+# ----------------------------------------------------------------
+
+_config = {
+    'tol': emach,
+}
+
+def set_tolerance(tol):
+    """
+    Set the default relative tolerance of the constructions and of the pruning:
+    the coefficients below tol times the scale of a fun are negligible.
+    Funs built with a larger tolerance have fewer coefficients.
+    tol: the tolerance, machine epsilon by default
+    """
+    if not tol > 0:
+        raise ValueError("The tolerance should be positive")
+    _config['tol'] = tol
+
+def get_tolerance():
+    """
+    The default tolerance.
+    """
+    return _config['tol']
+
+@contextmanager
+def tolerance(tol):
+    """
+    Context manager setting the default tolerance inside a with block::
+
+        with tolerance(1e-6):
+            f = Chebfun.from_function(np.exp)
+    """
+    previous = get_tolerance()
+    set_tolerance(tol)
+    try:
+        yield
+    finally:
+        set_tolerance(previous)
+
+def resolve_tolerance(tol=None):
+    """
+    The tolerance tol if given, the default tolerance otherwise.
+    """
+    if tol is None:
+        return get_tolerance()
+    return tol
+
+def max_tolerance(*funs):
+    """
+    The tolerance of a result computed from funs: the largest of their tolerances.
+    """
+    return max(fun._tol for fun in funs)
+
+def parallel_map(function, items, executor=None, workers=None):
+    """
+    List of function(item) for the items, computed on the executor if given,
+    or on a pool of workers threads if workers > 1.
+    """
+    items = list(items)
+    if executor is None and workers is not None and workers > 1 and len(items) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(workers) as pool:
+            return list(pool.map(function, items))
+    if executor is not None:
+        return list(executor.map(function, items))
+    return [function(item) for item in items]
+
+class Rescaled(object):
+    """
+    The function f on [a,b] seen as a function on [-1,1].
+    Unlike a lambda, it can be sent to worker processes if f can.
+    """
+    def __init__(self, f, domain):
+        self.f = f
+        self.a, self.b = domain[0], domain[-1]
+
+    def __call__(self, t):
+        return self.f(0.5*(self.b-self.a)*t + 0.5*(self.a+self.b))
+
+class Pointwise(object):
+    """
+    Evaluation of f on a chunk of points, one point at a time if f is not vectorized.
+    """
+    def __init__(self, f, vectorized=True):
+        self.f = f
+        self.vectorized = vectorized
+
+    def __call__(self, x):
+        if self.vectorized:
+            return np.asarray(self.f(x))
+        return np.array([self.f(t) for t in x])
+
+def evaluate_function(f, x, vectorized=True, executor=None, chunksize=None):
+    """
+    Values of f at the points x.
+    vectorized: whether f accepts an array of points; otherwise f is called on each point
+    executor: an executor (thread or process pool) on which the chunks of points are evaluated;
+    with a process pool, f must be picklable
+    chunksize: number of points per chunk; by default, the points are split in four chunks per processor
+    """
+    if executor is None and vectorized:
+        return f(x)
+    if executor is None:
+        return Pointwise(f, vectorized)(x)
+    if chunksize is None:
+        chunksize = -(-len(x) // (4*cpu_count()))
+    chunks = [x[start:start+chunksize] for start in range(0, len(x), chunksize)]
+    return np.concatenate(parallel_map(Pointwise(f, vectorized), chunks, executor))
+
+def standard_chop(coeffs, tol=emach):
+    """
+    Plateau-based chopping rule: number of coefficients to keep,
+    found by detecting where the envelope of the coefficients levels off
+    (for instance at the level of the noise or of the rounding errors).
+    The rule needs at least 17 coefficients, and otherwise keeps them all.
+    coeffs: array of shape (n,) or (n, k), in which case the rule is applied to each column
+    tol: relative tolerance
+    Return: the number of coefficients to keep, or an array of shape (k,) of them
+
+    See:
+    J. L. Aurentz and L. N. Trefethen, Chopping a Chebyshev series,
+    ACM Trans. Math. Software, 43 (2017), pp. 33:1–33:21.
+    """
+    b = np.abs(np.asarray(coeffs))
+    if b.ndim == 1:
+        return standard_chop(b[:, np.newaxis], tol)[0]
+    n = len(b)
+    cutoffs = np.full(b.shape[1], n)
+    if tol >= 1:
+        cutoffs[:] = 1
+        return cutoffs
+    if n < 17:
+        return cutoffs
+
+    # 1) Monotonically non-increasing envelope, normalised to start at one
+    envelope = np.maximum.accumulate(b[::-1], axis=0)[::-1]
+    scale = envelope[0]
+    zero = (scale == 0)
+    envelope = envelope/np.where(zero, 1., scale)
+
+    # 2) Find the first plateau: from j to j2 (indices starting at one), the
+    #    envelope decreases by less than a factor r, which depends on its level
+    j = np.arange(2, n+1)
+    j2 = np.floor(1.25*j + 5.5).astype(int)
+    j, j2 = j[j2 <= n], j2[j2 <= n]
+    e1 = envelope[j-1]
+    e2 = envelope[j2-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = 3*(1 - np.log(e1)/np.log(tol))
+        plateau = (e1 == 0) | (e2/e1 > r)
+    found = np.any(plateau, axis=0) & ~zero
+    first = np.argmax(plateau, axis=0)
+    plateau_point = j[first] - 1
+    j2 = j2[first]
+
+    # 3) Cut where the envelope, plus a linear function biasing towards
+    #    the left end, is minimal
+    columns = np.arange(b.shape[1])
+    low = tol**(7/6)
+    j3 = np.sum(envelope >= low, axis=0)
+    shorten = j3 < j2
+    j2 = np.where(shorten, j3 + 1, j2)
+    envelope = envelope.copy()
+    envelope[j2[shorten]-1, columns[shorten]] = low
+    rows = np.arange(n)[:, np.newaxis]
+    slope = (-1/3)*np.log10(tol)/np.maximum(j2 - 1, 1)
+    with np.errstate(divide='ignore'):
+        cc = np.log10(envelope) + rows*slope
+    cc[rows >= j2] = np.inf
+    d = np.argmin(cc, axis=0) + 1
+    cut = np.maximum(d - 1, 1)
+    cut = np.where(envelope[plateau_point-1, columns] == 0, plateau_point, cut)
+
+    cutoffs[found] = cut[found]
+    cutoffs[zero] = 1
+    return cutoffs
 
 def cast_scalar(method):
     """
     Cast scalars to constant interpolating objects
+    The operands of the deferred types (such as lazy expressions)
+    are left to their own reflected operators.
     """
     @wraps(method)
     def new_method(self, other):
         if np.isscalar(other):
-            other = type(self)([other],self.domain())
+            other = type(self)([other],self.domain(),tol=self._tol)
+        elif isinstance(other, self._deferred_operands):
+            return NotImplemented
         return method(self, other)
     return new_method
 
@@ -64,61 +251,201 @@ class Polyfun(object):
         """
         Initialise from another instance
         """
-        return self(other.values(),other.domain())
+        return self(other.values(),other.domain(),tol=other._tol)
 
     @classmethod
-    def from_coeff(self, chebcoeff, domain=None, prune=True, vscale=1.):
+    def from_coeff(self, chebcoeff, domain=None, prune=True, vscale=1., tol=None):
         """
         Initialise from provided coefficients
         prune: Whether to prune the negligible coefficients
         vscale: the scale to use when pruning
+        tol: the tolerance used when pruning, which stays with the fun; defaults to get_tolerance()
         """
+        tol = resolve_tolerance(tol)
         coeffs = np.asarray(chebcoeff)
         if prune:
-            N = self._cutoff(coeffs, vscale)
+            N = self._cutoff(coeffs, vscale, tol)
             pruned_coeffs = coeffs[:N]
         else:
             pruned_coeffs = coeffs
         values = self.polyval(pruned_coeffs)
-        return self(values, domain, vscale)
+        fun = self(values, domain, vscale, tol)
+        # keep the coefficients to avoid transforming the values back;
+        # they are copied, as the caller may modify its array
+        fun._coeffs = np.array(pruned_coeffs)
+        return fun
+
+    # Chopping rules:
+    #   'classic': the last two coefficients are below max(128*emach, tol)*max|coeffs|,
+    #   'plateau': the coefficients level off (see standard_chop)
+    chop_rules = ('classic', 'plateau')
+
+    @classmethod
+    def check_chop(self, chop):
+        if chop not in self.chop_rules:
+            raise ValueError("Unknown chopping rule '{}'".format(chop))
 
     @classmethod
-    def dichotomy(self, f, kmin=2, kmax=12, raise_no_convergence=True,):
+    def dichotomy(self, f, kmin=2, kmax=12, raise_no_convergence=True, chop='classic', tol=None,
+                  max_evals=None, time_limit=None, vectorized=True, executor=None, chunksize=None):
         """
         Compute the coefficients for a function f by dichotomy.
+        The Chebyshev grids are nested, so f is only evaluated at the new points at each level.
         kmin, kmax: log2 of number of interpolation points to try
         raise_no_convergence: whether to raise an exception if the dichotomy does not converge
-        """
+        chop: the chopping rule, 'classic' or 'plateau'; with 'plateau',
+        the returned coefficients are already chopped
+        tol: relative tolerance; defaults to get_tolerance()
+        max_evals, time_limit: budget in evaluations of f and in seconds (see _dichotomy);
+        when the budget is exhausted, the coefficients of the last level are returned without raising
+        vectorized, executor, chunksize: how to evaluate f (see evaluate_function)
+        """
+        coeffs, sampled, converged, tail = self._dichotomy(
+            f, kmin, kmax, raise_no_convergence, chop, tol, max_evals, time_limit,
+            vectorized=vectorized, executor=executor, chunksize=chunksize)
+        return coeffs
 
+    @classmethod
+    def _dichotomy(self, f, kmin=2, kmax=12, raise_no_convergence=True, chop='classic', tol=None,
+                   max_evals=None, time_limit=None, sampled=None, kstart=None,
+                   vectorized=True, executor=None, chunksize=None):
+        """
+        Dichotomy, with an optional budget.
+        The first level is always sampled; a finer level is only sampled if
+        the total number of evaluations stays within max_evals, and if it is
+        expected to end within time_limit seconds of the start, its cost being
+        estimated as twice that of the previous level.
+        The evaluations of f are not interrupted, so the time limit may be exceeded
+        if f is slower on the finer grid.
+        sampled: samples of f on 2**kmin+1 Chebyshev points, used instead of sampling the first level;
+        max_evals then only counts the new evaluations
+        kstart: level at which to start instead of kmin (warm start); if it converges,
+        the coarser levels are checked from its samples, without evaluating f;
+        it is lowered if necessary so that its samples fit within max_evals
+        vectorized, executor, chunksize: how to evaluate f (see evaluate_function)
+        Return: (coeffs, sampled, converged, tail), where sampled are the values at
+        the finest level and tail is the magnitude of its last coefficients
+        """
+        self.check_chop(chop)
+        tol = resolve_tolerance(tol)
+        sampling = {'vectorized': vectorized, 'executor': executor, 'chunksize': chunksize}
+        start = default_timer()
+        evals = 0
+        if kstart is not None:
+            kstart = min(kstart, kmax-1)
+            if max_evals is not None:
+                while kstart > kmin and pow(2, kstart) + 1 > max_evals:
+                    kstart -= 1
+        if kstart is not None and sampled is None and kstart > kmin:
+            sampled = self.sample_function(f, pow(2, kstart), **sampling)
+            evals = len(sampled)
+            coeffs, converged, last, bnd = self._check_level(sampled, chop, tol)
+            if converged:
+                # search down: the coarser grids are the even points of the finer ones
+                coarser = sampled
+                for k in range(kstart-1, kmin-1, -1):
+                    coarser = coarser[::2]
+                    level = self._check_level(coarser, chop, tol)
+                    if not level[1]:
+                        break
+                    coeffs, converged, last, bnd = level
+                return coeffs, sampled, converged, np.max(last)
+            # search up from the samples
+            kmin = kstart
         for k in range(kmin, kmax):
             N = pow(2, k)
 
-            sampled = self.sample_function(f, N)
-            coeffs = self.polyfit(sampled)
-
-            # 3) Check for negligible coefficients
-            #    If within bound: get negligible coeffs and bread
-            bnd = self._threshold(np.max(np.abs(coeffs)))
-
-            last = abs(coeffs[-2:])
-            if np.all(last <= bnd):
+            # 1) Sample f, reusing the samples of the coarser level,
+            #    unless the budget does not allow for it
+            now = default_timer()
+            if k == kmin:
+                if sampled is None:
+                    sampled = self.sample_function(f, N, **sampling)
+                    evals = N + 1
+            else:
+                if max_evals is not None and evals + N//2 > max_evals:
+                    break
+                if time_limit is not None and now - start + 2*(now - level_start) > time_limit:
+                    break
+                sampled = self.refine_samples(f, sampled, **sampling)
+                evals += N//2
+            level_start = now
+
+            # 2) Compute the Chebyshev coefficients and check for negligible ones
+            coeffs, converged, last, bnd = self._check_level(sampled, chop, tol)
+            if converged:
                 break
         else:
             if raise_no_convergence:
                 raise self.NoConvergence(last, bnd)
-        return coeffs
+        return coeffs, sampled, converged, np.max(last)
+
+    @classmethod
+    def _check_level(self, sampled, chop, tol):
+        """
+        Coefficients of the samples at one level of the dichotomy, and whether they converged.
+        Return: (coeffs, converged, last, bnd), where last are the magnitudes of the last
+        coefficients and bnd the bound they are compared to;
+        with the plateau rule, converged coefficients are chopped
+        """
+        coeffs = self.polyfit(sampled)
+        if chop == 'plateau':
+            # the envelope of all the components is chopped
+            envelope = np.max(np.abs(coeffs).reshape(len(coeffs), -1), axis=1)
+            bnd = tol
+            last = envelope[-2:]
+            cutoff = standard_chop(envelope, bnd)
+            converged = cutoff < len(coeffs)
+            if converged:
+                coeffs = coeffs[:cutoff]
+        else:
+            bnd = self._threshold(np.max(np.abs(coeffs)), tol)
+            last = abs(coeffs[-2:])
+            converged = np.all(last <= bnd)
+        return coeffs, converged, last, bnd
 
     @classmethod
-    def from_function(self, f, domain=None, N=None):
+    def from_function(self, f, domain=None, N=None, chop='classic', tol=None,
+                      max_evals=None, time_limit=None, start=None, cache=None, key=None,
+                      vectorized=True, executor=None, chunksize=None, refinable=False):
         """
         Initialise from a function to sample.
         N: optional parameter which indicates the range of the dichotomy
-        """
-        # rescale f to the unit domain 
+        chop: the chopping rule, 'classic' or 'plateau' (see dichotomy)
+        tol: relative tolerance, which stays with the fun; defaults to get_tolerance()
+        max_evals, time_limit: budget in evaluations of f and in seconds (see _dichotomy);
+        if it is exhausted, the fun of the last level is returned, and its converged() is False
+        start: a similar fun, or its size, for a warm start: the dichotomy starts
+        at that size, and goes down or up from there
+        cache: a DiskCache in which the coefficients are stored, indexed by key, domain, N, chop and tol;
+        only the converged funs, or those constructed with N, are stored
+        key: the key of f in the cache; defaults to its qualified name and a hash of its code (see function_key)
+        vectorized: whether f accepts an array of points; otherwise f is called on each point
+        executor, chunksize: executor on which to evaluate f by chunks of points (see evaluate_function);
+        with a process pool, f must be picklable
+        refinable: whether the fun keeps f and its finest samples, so that it can be refined
+        (see refine); funs read from the cache are not refinable
+        """
+        if cache is not None:
+            tol = resolve_tolerance(tol)
+            domain = self.get_default_domain(domain)
+            entry = (function_key(f, key), [float(x) for x in domain], N, chop, tol)
+            stored = cache.get(entry)
+            if stored is not None:
+                fun = self.from_coeff(stored['coeffs'], domain, prune=False, tol=tol)
+                fun._converged = bool(stored['converged'])
+                fun._tail = float(stored['tail'])
+                return fun
+            fun = self.from_function(f, domain, N, chop, tol, max_evals, time_limit, start,
+                                     vectorized=vectorized, executor=executor, chunksize=chunksize,
+                                     refinable=refinable)
+            if fun.converged() or N is not None:
+                cache.set(entry, {'coeffs': fun.coefficients(), 'converged': fun.converged(), 'tail': fun.tail()})
+            return fun
+
         domain = self.get_default_domain(domain)
-        a,b = domain[0], domain[-1]
-        map_ui_ab = lambda t: 0.5*(b-a)*t + 0.5*(a+b) 
-        args = {'f': lambda t: f(map_ui_ab(t))}
+        args = {'max_evals': max_evals, 'time_limit': time_limit,
+                'vectorized': vectorized, 'executor': executor, 'chunksize': chunksize}
         if N is not None: # N is provided
             nextpow2 = int(np.log2(N))+1
             args['kmin'] = nextpow2
@@ -126,27 +453,86 @@ class Polyfun(object):
             args['raise_no_convergence'] = False
         else:
             args['raise_no_convergence'] = True
+            if start is not None:
+                args['kstart'] = self._start_level(start)
+        # rescale f to the unit domain 
+        return self._from_dichotomy(Rescaled(f, domain), domain, chop, tol, refinable, **args)
 
-        # Find out the right number of coefficients to keep
-        coeffs = self.dichotomy(**args)
+    @classmethod
+    def _start_level(self, start):
+        """
+        Level of the dichotomy for a warm start: log2 of the smallest number of
+        intervals of a Chebyshev grid on which a fun of that size fits.
+        start: a fun, or a size
+        """
+        if isinstance(start, Polyfun):
+            start = start.size()
+        return int(np.ceil(np.log2(max(start - 1, 1))))
 
-        return self.from_coeff(coeffs, domain)
+    @classmethod
+    def _from_dichotomy(self, f, domain, chop, tol, refinable, **args):
+        """
+        Fun computed by _dichotomy for the function f, already rescaled to [-1,1].
+        refinable: whether the fun keeps f and the samples of the finest level, from which refine() starts
+        """
+        # Find out the right number of coefficients to keep
+        tol = resolve_tolerance(tol)
+        coeffs, sampled, converged, tail = self._dichotomy(f, chop=chop, tol=tol, **args)
+
+        # the plateau rule has already chopped the coefficients
+        fun = self.from_coeff(coeffs, domain, prune=(chop == 'classic'), tol=tol)
+        fun._converged = converged
+        fun._tail = tail
+        if refinable:
+            fun._source = (f, sampled, chop, args.get('vectorized', True))
+        return fun
+
+    def refine(self, tol=None, kmax=None, raise_no_convergence=True, max_evals=None, time_limit=None,
+               executor=None, chunksize=None):
+        """
+        Continue the construction from a function of an unconverged or too coarse fun,
+        for instance one constructed with N, a budget, or a larger tolerance.
+        The fun must have been constructed with refinable=True.
+        The dichotomy restarts from the finest level sampled, so only the new points are evaluated.
+        Return: a new refinable fun; the fun itself is unchanged.
+        tol: the new relative tolerance; defaults to that of the fun
+        kmax: log2 of the maximum number of interpolation points; defaults to 12,
+        allowing at least one more level
+        raise_no_convergence, max_evals, time_limit, executor, chunksize: see dichotomy
+        """
+        if self._source is None:
+            raise ValueError("Only funs constructed from a function with refinable=True can be refined")
+        f, sampled, chop, vectorized = self._source
+        if tol is None:
+            tol = self._tol
+        kmin = int(round(np.log2(len(sampled) - 1)))
+        if kmax is None:
+            kmax = max(12, kmin + 2)
+        return self._from_dichotomy(f, self.domain(), chop, tol, True, kmin=kmin, kmax=kmax,
+                                    raise_no_convergence=raise_no_convergence,
+                                    max_evals=max_evals, time_limit=time_limit, sampled=sampled,
+                                    vectorized=vectorized, executor=executor, chunksize=chunksize)
 
     @classmethod
-    def _threshold(self, vscale):
+    def _threshold(self, vscale, tol=None):
         """
         Compute the threshold at which coefficients are trimmed.
+        tol: relative tolerance; defaults to get_tolerance().
+        Below 128*emach, the threshold stays at 128*emach*vscale to leave room for rounding errors.
         """
-        bnd = 128*emach*vscale
+        bnd = max(128*emach, resolve_tolerance(tol))*vscale
         return bnd
 
     @classmethod
-    def _cutoff(self, coeffs, vscale):
+    def _cutoff(self, coeffs, vscale, tol=None):
         """
         Compute cutoff index after which the coefficients are deemed negligible.
         """
-        bnd = self._threshold(vscale)
-        inds  = np.nonzero(abs(coeffs) >= bnd)
+        bnd = self._threshold(vscale, tol)
+        if bnd > 0:
+            inds  = np.nonzero(abs(coeffs) >= bnd)
+        else: # zero scale: only the exact zeros are negligible
+            inds  = np.nonzero(coeffs)
         if len(inds[0]):
             N = inds[0][-1]
         else:
@@ -154,31 +540,77 @@ class Polyfun(object):
         return N+1
  
  
-    def __init__(self, values=0., domain=None, vscale=None):
+    # types of the operands whose reflected operators take precedence (see cast_scalar)
+    _deferred_operands = ()
+
+    # Only the essential state is stored; the interpolator and the vscale are computed on first use
+    __slots__ = ('_values', '_coeffs', '_domain', '_vscale', '_tol', '_p', '_converged', '_tail', '_source',
+                 '__weakref__')
+
+    def __init__(self, values=0., domain=None, vscale=None, tol=None):
         """
         Init an object from values at interpolation points.
         values: Interpolation values
-        vscale: The actual vscale; computed automatically if not given
-        """
-        avalues = np.asarray(values,)
-        avalues1 = np.atleast_1d(avalues)
-        N = len(avalues1)
-        points = self.interpolation_points(N)
-        self._values = avalues1
-        if vscale is not None:
-            self._vscale = vscale
-        else:
-            self._vscale = np.max(np.abs(self._values))
-        self.p = self.interpolator(points, avalues1)
+        vscale: The actual vscale; computed on first use if not given
+        tol: The tolerance of the operations on the object; defaults to get_tolerance()
+        """
+        self._values = np.atleast_1d(np.asarray(values))
+        self._coeffs = None
+        self._p = None
+        self._vscale = vscale
+        self._tol = resolve_tolerance(tol)
+        self._converged = True
+        self._tail = None
+        self._source = None
+        self._domain = np.array(self.get_default_domain(domain))
+
+    @property
+    def p(self):
+        """
+        Barycentric interpolator on [-1,1], constructed on first use.
+        """
+        if self._p is None:
+            points = self.interpolation_points(self.size())
+            self._p = self.interpolator(points, self._values)
+        return self._p
+
+    # ----------------------------------------------------------------
+    # Pickling
+    # ----------------------------------------------------------------
+
+    def __getstate__(self):
+        """
+        Minimal state: the values, the domain, the vscale and the tolerance,
+        and the flags of the construction.
+        The interpolator and the coefficients are rebuilt after unpickling,
+        and the source function of refine() is dropped.
+        """
+        return {
+            'values': self._values,
+            'domain': self._domain,
+            'vscale': self._vscale,
+            'tol': self._tol,
+            'converged': self._converged,
+            'tail': self._tail,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state['values'], state['domain'], state['vscale'], state['tol'])
+        self._converged = state['converged']
+        self._tail = state['tail']
+
+    # ----------------------------------------------------------------
+    # Maps from [-1,1] <-> [a,b]
+    # ----------------------------------------------------------------
+
+    def _ab_to_ui(self, x):
+        a, b = self._domain[0], self._domain[-1]
+        return (2.0*x-a-b)/(b-a)
+
+    def _ui_to_ab(self, t):
+        a, b = self._domain[0], self._domain[-1]
+        return 0.5*(b-a)*t + 0.5*(a+b)
 
-        domain = self.get_default_domain(domain)
-        self._domain = np.array(domain)
-        a,b = domain[0], domain[-1]
-        
-        # maps from [-1,1] <-> [a,b]
-        self._ab_to_ui = lambda x: (2.0*x-a-b)/(b-a)
-        self._ui_to_ab = lambda t: 0.5*(b-a)*t + 0.5*(a+b) 
- 
     def same_domain(self, fun2):
         """
         Returns True if the domains of two objects are the same.
@@ -201,7 +633,7 @@ class Polyfun(object):
             ' [%5.1f, %5.1f]     %5d       %5.2f   %5.2f\n '
             'vscale = %1.2e') % (
                 str(type(self)).split('.')[-1].split('>')[0][:-1],
-                a,b,self.size(),vals[-1],vals[0],self._vscale,)    
+                a,b,self.size(),vals[-1],vals[0],self.vscale(),)    
 
     def __str__(self):
         return "<{0}({1})>".format(
@@ -211,14 +643,116 @@ class Polyfun(object):
     # Basic Operator Overloads
     # ----------------------------------------------------------------
 
+    # Evaluation uses the Clenshaw recurrence on the coefficients for at least
+    # clenshaw_min_points points, and the barycentric formula otherwise.
+    # Small funs switch earlier, from clenshaw_points_per_coeff points per coefficient
+    # (but at least 200 points): the crossover grows from about 200 points
+    # for sizes up to 4 to about 1000 points from size 25 on.
+    # See benchmarks/bench_evaluation.py for the crossover.
+    clenshaw_min_points = 1000
+    clenshaw_points_per_coeff = 40
+
     def __call__(self, x):
-        return self.p(self._ab_to_ui(x))
+        t = self._ab_to_ui(x)
+        if self._use_clenshaw(np.size(x)):
+            return self._clenshaw_call(t)
+        return self.p(t)
+
+    def _clenshaw_call(self, t):
+        """
+        Evaluate at the points t in [-1,1] with the Clenshaw recurrence.
+        As with the barycentric formula, the values at the endpoints are exact.
+        """
+        t = np.asarray(t)
+        result = np.asarray(self.clenshaw(self.coefficients(), t))
+        values = self.values()
+        for end, index in [(1., 0), (-1., -1)]:
+            at_end = (t == end)
+            if np.any(at_end):
+                result[at_end] = values[index]
+        return result
+
+    def _use_clenshaw(self, npoints):
+        """
+        Whether to evaluate at npoints points with Clenshaw rather than with the barycentric formula,
+        depending on the number of points and on the size of the fun.
+        """
+        threshold = min(self.clenshaw_min_points, max(200, self.clenshaw_points_per_coeff*self.size()))
+        return npoints >= threshold
+
+    @classmethod
+    def uniform_points(self, n):
+        """
+        n equispaced points in [-1, 1], boundaries included.
+        """
+        return np.linspace(-1., 1., n)
+
+    def sample_uniform(self, n):
+        """
+        Values at n equispaced points of the domain, boundaries included.
+        The values are computed from the coefficients with the Clenshaw recurrence,
+        which avoids the M x N temporary of the barycentric formula.
+        Return: (points, values)
+        """
+        t = self.uniform_points(n)
+        x = self._ui_to_ab(t)
+        # the affine map may round the endpoints outside the domain
+        x[0] = self._domain[0]
+        if n > 1:
+            x[-1] = self._domain[-1]
+        return x, self._clenshaw_call(t)
+
+    # Number of points evaluated at once by evaluate and iter_evaluate
+    chunk_size = 2**16
+
+    def iter_evaluate(self, x, chunk_size=None):
+        """
+        Generator of the values at the points x, chunk by chunk.
+        x: array of points (possibly memory-mapped), traversed in flat order
+        chunk_size: number of points per chunk
+        """
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+        x = np.asarray(x)
+        flat = x.reshape(-1)
+        for start in range(0, len(flat), chunk_size):
+            yield self(flat[start:start+chunk_size])
+
+    def evaluate(self, x, out=None, chunk_size=None):
+        """
+        Evaluate at the points x chunk by chunk, so the memory used is bounded
+        by the chunk size instead of the number of points.
+        x: array of points, possibly memory-mapped
+        out: array of shape x.shape + value shape in which to write the values, possibly memory-mapped
+        chunk_size: number of points per chunk
+        """
+        x = np.asarray(x)
+        value_shape = np.shape(self.values())[1:]
+        shape = x.shape + value_shape
+        if out is None:
+            dtype = np.result_type(self.values(), x, 1.)
+            out = np.empty(shape, dtype=dtype)
+        elif out.shape != shape:
+            raise ValueError("out should have shape {}".format(shape))
+        flat_out = out.reshape((-1,) + value_shape)
+        if not np.may_share_memory(flat_out, out):
+            raise ValueError("out should be contiguous")
+        start = 0
+        for values in self.iter_evaluate(x, chunk_size):
+            stop = start + len(values)
+            flat_out[start:stop] = values
+            start = stop
+        return out
 
     def __getitem__(self, s):
         """
         Components s of the fun.
         """
-        return self.from_data(self.values().T[s].T)
+        component = self.from_data(self.values().T[s].T)
+        component._tol = self._tol
+        if self._coeffs is not None:
+            component._coeffs = self._coeffs.T[s].T
+        return component
 
     def __bool__(self):
         """
@@ -255,11 +789,24 @@ class Polyfun(object):
         padded[:len(small_coeffs)] = small_coeffs
         # add the values and create a new object with them
         chebsum = big_coeffs + padded
-        new_vscale = np.max([self._vscale, other._vscale])
+        new_vscale = np.max([self.vscale(), other.vscale()])
+        new_tol = max_tolerance(self, other)
+        if len(small_coeffs) == 1 and self._cutoff(chebsum, new_vscale, new_tol) == len(chebsum):
+            return ps[big]._shift(small_coeffs[0], chebsum, new_vscale, new_tol)
         return self.from_coeff(
-            chebsum, domain=self.domain(), vscale=new_vscale
+            chebsum, domain=self.domain(), vscale=new_vscale, tol=new_tol
         )
 
+    def _shift(self, constant, coeffs, vscale, tol):
+        """
+        The fun plus a constant, with the given coefficients.
+        The values are shifted instead of being transformed back from the coefficients,
+        so they stay exact (for instance, f - f(a) vanishes exactly at a).
+        """
+        shifted = type(self)(self.values() + constant, self.domain(), vscale, tol)
+        shifted._coeffs = coeffs
+        return shifted
+
     __radd__ = __add__
 
 
@@ -273,6 +820,37 @@ class Polyfun(object):
     def __rsub__(self, other):
         return -(self - other)
 
+    @cast_scalar
+    def __mul__(self, other):
+        """
+        Multiplication.
+        The product of funs of sizes m and n is a polynomial of size m+n-1,
+        so it is computed exactly from the values at m+n-1 Chebyshev points.
+        """
+        if not self.same_domain(other):
+            raise self.DomainMismatch(self.domain(),other.domain())
+
+        new_vscale = self.vscale() * other.vscale()
+        new_tol = max_tolerance(self, other)
+        ps = [self, other]
+        big = other.size() > self.size()
+        small = not big
+        if ps[small].size() == 1:
+            # multiplication by a constant: scale the values and coefficients
+            values = (ps[big].values().T * ps[small].values().T).T
+            coeffs = (ps[big].coefficients().T * ps[small].values().T).T
+            if self._cutoff(coeffs, new_vscale, new_tol) == len(coeffs):
+                scaled = type(self)(values, self.domain(), new_vscale, new_tol)
+                scaled._coeffs = coeffs
+                return scaled
+        else:
+            N = self.size() + other.size() - 1
+            values = (self.resample(N).T * other.resample(N).T).T
+            coeffs = self.polyfit(values)
+        return self.from_coeff(
+            coeffs, domain=self.domain(), vscale=new_vscale, tol=new_tol
+        )
+
     def __rmul__(self, other):
         return self.__mul__(other)
 
@@ -283,24 +861,76 @@ class Polyfun(object):
         """
         Negation.
         """
-        return self.from_data(-self.values(),domain=self.domain())
+        neg = self.from_data(-self.values(),domain=self.domain())
+        neg._tol = self._tol
+        if self._coeffs is not None:
+            neg._coeffs = -self._coeffs
+        return neg
 
 
     def __abs__(self):
-        return self.from_function(lambda x: abs(self(x)),domain=self.domain())
+        return self.from_function(lambda x: abs(self(x)),domain=self.domain(),tol=self._tol)
 
     # ----------------------------------------------------------------
     # Attributes
     # ----------------------------------------------------------------
 
     def size(self):
-        return self.p.n
+        return len(self._values)
+
+    def vscale(self):
+        """
+        Scale of the fun: the maximum of the absolute values, unless given at the construction.
+        """
+        if self._vscale is None:
+            self._vscale = np.max(np.abs(self._values))
+        return self._vscale
+
+    def tolerance(self):
+        """
+        The relative tolerance with which the fun was built.
+        """
+        return self._tol
+
+    def converged(self):
+        """
+        False if the construction from a function stopped before convergence,
+        either because its budget was exhausted or because N was too small.
+        """
+        return self._converged
+
+    def tail(self):
+        """
+        Magnitude of the last Chebyshev coefficients at the finest level sampled
+        by the construction from a function, and None for the other funs.
+        An estimate of the error of unconverged funs.
+        """
+        return self._tail
 
     def coefficients(self):
-        return self.polyfit(self.values())
+        """
+        Chebyshev coefficients, computed once and then stored.
+        """
+        if self._coeffs is None:
+            self._coeffs = self.polyfit(self.values())
+        return self._coeffs
 
     def values(self):
         return self._values
+
+    def resample(self, N):
+        """
+        Values at N Chebyshev points, with N at least the size of the fun.
+        """
+        size = self.size()
+        if N < size:
+            raise ValueError("Cannot resample on fewer points than the size")
+        if N == size:
+            return self.values()
+        coeffs = self.coefficients()
+        padded = np.zeros((N,) + np.shape(coeffs)[1:], dtype=coeffs.dtype)
+        padded[:size] = coeffs
+        return self.polyval(padded)
         
     def domain(self):
         return self._domain        
@@ -336,10 +966,13 @@ class Polyfun(object):
     def restrict(self,subinterval):
         """
         Return a Polyfun that matches self on subinterval.
+        The coefficients are computed directly from those of self.
         """
         if (subinterval[0] < self._domain[0]) or (subinterval[1] > self._domain[1]):
             raise ValueError("Can only restrict to subinterval") 
-        return self.from_function(self, subinterval)
+        ui_subinterval = self._ab_to_ui(np.asarray(subinterval, dtype=float))
+        coeffs = self.restrict_coefficients(self.coefficients(), ui_subinterval)
+        return self.from_coeff(coeffs, domain=subinterval, vscale=self.vscale(), tol=self._tol)
 
 
     # ----------------------------------------------------------------
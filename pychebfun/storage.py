@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# coding: UTF-8
+"""
+Storage module
+==============
+
+Chebfuns, lists and dictionaries of chebfuns, and ChebfunArrays are saved
+in a binary file, from which they are loaded without copying
+by mapping the file in memory::
+
+    save('library.chebfun', {'exp': Chebfun.from_function(np.exp), 'cos': Chebfun.from_function(np.cos)})
+    library = load('library.chebfun')
+    library['exp'](.5)  # evaluated from the mapped buffers
+
+Layout of the file:
+
+    - the magic string b'PYCHEBFUN', the format version (uint8) and the
+      length of the header (little-endian uint64),
+    - the header: a JSON description of the objects, with the dtype, shape
+      and offset of each array,
+    - the arrays, each one starting at a multiple of 64 bytes.
+
+"""
+from __future__ import division
+
+import json
+import struct
+
+import numpy as np
+
+from .polyfun import Polyfun
+from .chebfun import Chebfun
+from .batch import ChebfunArray
+
+_MAGIC = b'PYCHEBFUN'
+_VERSION = 1
+_ALIGNMENT = 64
+
+def _aligned(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+class _Writer(object):
+    """
+    Collect the arrays to write, and describe them in the header.
+    """
+    def __init__(self):
+        self.arrays = []
+        self.offset = 0
+
+    def block(self, array):
+        array = np.ascontiguousarray(array)
+        description = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': self.offset}
+        self.arrays.append((self.offset, array))
+        self.offset = _aligned(self.offset + array.nbytes)
+        return description
+
+    def describe(self, obj):
+        if isinstance(obj, ChebfunArray):
+            return {
+                'kind': 'array',
+                'domain': [float(x) for x in obj.domain()],
+                'tol': float(obj.tolerance()),
+                'coeffs': self.block(obj.coefficients()),
+                'sizes': self.block(obj.sizes()),
+                'vscales': self.block(obj._vscales),
+            }
+        if isinstance(obj, Polyfun):
+            return {
+                'kind': 'fun',
+                'domain': [float(x) for x in obj.domain()],
+                'vscale': float(obj.vscale()),
+                'tol': float(obj.tolerance()),
+                'converged': bool(obj.converged()),
+                'tail': None if obj.tail() is None else float(obj.tail()),
+                'values': self.block(obj.values()),
+                'coeffs': self.block(obj.coefficients()),
+            }
+        if isinstance(obj, dict):
+            return {'kind': 'dict', 'items': dict((str(key), self.describe(value)) for key, value in obj.items())}
+        if isinstance(obj, (list, tuple)):
+            return {'kind': 'list', 'items': [self.describe(value) for value in obj]}
+        raise TypeError('Impossible to save an object of type {}'.format(type(obj)))
+
+def save(path, obj):
+    """
+    Save a chebfun, a ChebfunArray, or a list or dictionary (with string keys) of them.
+    """
+    writer = _Writer()
+    header = json.dumps(writer.describe(obj)).encode('utf-8')
+    prefix = _MAGIC + struct.pack('<BQ', _VERSION, len(header))
+    start = _aligned(len(prefix) + len(header))
+    with open(path, 'wb') as stream:
+        stream.write(prefix)
+        stream.write(header)
+        for offset, array in writer.arrays:
+            stream.seek(start + offset)
+            stream.write(array.tobytes())
+        stream.truncate(start + writer.offset)
+
+def _read_header(stream):
+    prefix = stream.read(len(_MAGIC) + 9)
+    if prefix[:len(_MAGIC)] != _MAGIC:
+        raise ValueError('Not a chebfun file')
+    version, length = struct.unpack('<BQ', prefix[len(_MAGIC):])
+    if version > _VERSION:
+        raise ValueError('Unsupported version {} of the chebfun format'.format(version))
+    header = json.loads(stream.read(length).decode('utf-8'))
+    return header, _aligned(len(prefix) + length)
+
+def _array(data, start, description):
+    """
+    View of the array described in the header, without copy.
+    """
+    dtype = np.dtype(str(description['dtype']))
+    shape = tuple(description['shape'])
+    begin = start + description['offset']
+    end = begin + dtype.itemsize*int(np.prod(shape))
+    return np.asarray(data[begin:end]).view(dtype).reshape(shape)
+
+def _build(data, start, description):
+    kind = description['kind']
+    if kind == 'array':
+        coeffs = _array(data, start, description['coeffs'])
+        sizes = _array(data, start, description['sizes'])
+        vscales = _array(data, start, description['vscales'])
+        return ChebfunArray(coeffs, description['domain'], vscales, sizes, description['tol'])
+    if kind == 'fun':
+        values = _array(data, start, description['values'])
+        fun = Chebfun(values, description['domain'], description['vscale'], description['tol'])
+        fun._coeffs = _array(data, start, description['coeffs'])
+        fun._converged = description['converged']
+        fun._tail = description['tail']
+        return fun
+    if kind == 'dict':
+        return dict((key, _build(data, start, value)) for key, value in description['items'].items())
+    if kind == 'list':
+        return [_build(data, start, value) for value in description['items']]
+    raise ValueError('Unknown kind {!r} in the chebfun file'.format(kind))
+
+def load(path, mmap=True):
+    """
+    Load the objects saved in path.
+    mmap: whether to map the file in memory; the values and coefficients
+    are then read-only views of the file, which are only read when used
+    """
+    with open(path, 'rb') as stream:
+        header, start = _read_header(stream)
+    if mmap:
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        data = np.fromfile(path, dtype=np.uint8)
+    return _build(data, start, header)
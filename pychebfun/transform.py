@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# coding: UTF-8
+"""
+Transform module
+================
+
+Going from values at Chebyshev points to Chebyshev coefficients (and back)
+amounts to a discrete cosine transform of type I.
+This module computes that transform with a choice of backends:
+
+    - 'scipy':   scipy.fft (scipy >= 1.4), multi-threaded with workers
+    - 'numpy':   numpy.fft on the even extension of the data
+    - 'fftpack': scipy.fftpack
+    - 'pyfftw':  pyfftw, if installed, multi-threaded with workers
+
+"""
+from __future__ import division
+
+import numpy as np
+import scipy.fftpack as fftpack
+
+try:
+    import scipy.fft as scipy_fft
+except ImportError: # scipy < 1.4
+    scipy_fft = None
+
+try:
+    import pyfftw.interfaces.scipy_fft as pyfftw_fft
+    import pyfftw.interfaces.cache as pyfftw_cache
+except ImportError:
+    pyfftw_fft = None
+
+# ----------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------
+
+def even_data(data):
+    """
+    Construct Extended Data Vector (equivalent to creating an
+    even extension of the original function)
+    Return: array of length 2(N-1)
+    For instance, [0,1,2,3,4] --> [0,1,2,3,4,3,2,1]
+    """
+    return np.concatenate([data, data[-2:0:-1]],)
+
+def _dct1_scipy(data, workers):
+    return scipy_fft.dct(data, type=1, axis=0, workers=workers)
+
+def _dct1_fftpack(data, workers):
+    return fftpack.dct(data, type=1, axis=0)
+
+def _dct1_numpy(data, workers):
+    N = len(data)
+    evened = even_data(data)
+    if np.iscomplexobj(data):
+        return np.fft.fft(evened, axis=0)[:N]
+    return np.real(np.fft.rfft(evened, axis=0))
+
+def _dct1_pyfftw(data, workers):
+    return pyfftw_fft.dct(data, type=1, axis=0, workers=workers)
+
+_backends = {
+    'scipy': _dct1_scipy,
+    'fftpack': _dct1_fftpack,
+    'numpy': _dct1_numpy,
+    'pyfftw': _dct1_pyfftw,
+}
+
+def available_backends():
+    """
+    Names of the backends which can be used in this installation.
+    The first one is the default; fftpack comes last as its DCT-I is less accurate.
+    """
+    available = ['numpy', 'fftpack']
+    if scipy_fft is not None:
+        available.insert(0, 'scipy')
+    if pyfftw_fft is not None:
+        available.append('pyfftw')
+    return available
+
+# ----------------------------------------------------------------
+# Configuration
+# ----------------------------------------------------------------
+
+_config = {
+    'backend': available_backends()[0],
+    'workers': None,
+}
+
+def set_backend(backend, workers=None):
+    """
+    Select the backend used for all the transforms.
+    backend: one of available_backends()
+    workers: default number of threads (only used by 'scipy' and 'pyfftw')
+    """
+    if backend not in _backends:
+        raise ValueError("Unknown backend '{}'".format(backend))
+    if backend not in available_backends():
+        raise ImportError("Backend '{}' is not installed".format(backend))
+    if backend == 'pyfftw':
+        # keep the FFTW plans between calls (scipy.fft keeps its own plan cache)
+        pyfftw_cache.enable()
+    _config['backend'] = backend
+    _config['workers'] = workers
+
+def get_backend():
+    """
+    Name of the current backend.
+    """
+    return _config['backend']
+
+# ----------------------------------------------------------------
+# Transform
+# ----------------------------------------------------------------
+
+def dct1(data, workers=None):
+    """
+    Unnormalised DCT of type I along the first axis:
+        y_k = x_0 + (-1)^k x_{N-1} + 2 sum_{j=1}^{N-2} x_j cos(pi j k/(N-1))
+    data: array; first dimension is the number of points (at least two)
+    workers: number of threads; defaults to the one given to set_backend
+    """
+    if workers is None:
+        workers = _config['workers']
+    transform = _backends[_config['backend']]
+    return transform(np.asarray(data), workers)
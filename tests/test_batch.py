@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# coding: UTF-8
+from __future__ import division
+
+from pychebfun import *
+
+import numpy as np
+np.seterr(all='raise')
+import numpy.testing as npt
+
+import unittest
+
+from .tools import *
+
+class TestChebfunArray(unittest.TestCase):
+    def setUp(self):
+        self.domain = [-1., 2.]
+        self.funs = [Chebfun.from_function(lambda x, k=k: np.sin(k*x) + .1*k, self.domain) for k in range(1, 6)]
+        self.array = ChebfunArray.from_funs(self.funs)
+        self.x = np.linspace(-1, 2, 20)
+
+    def assert_same(self, array, funs, atol=1e-13):
+        """
+        The array represents the funs, with the same sizes.
+        """
+        self.assertEqual(len(array), len(funs))
+        npt.assert_array_equal(array.sizes(), [fun.size() for fun in funs])
+        npt.assert_allclose(array(self.x), np.array([fun(self.x) for fun in funs]).T, atol=atol)
+
+    def test_from_funs(self):
+        self.assert_same(self.array, self.funs)
+        self.assertEqual(self.array.size(), max(fun.size() for fun in self.funs))
+        npt.assert_allclose(self.array.domain(), self.domain)
+
+    def test_domain_mismatch(self):
+        other = Chebfun.from_function(np.sin)
+        self.assertRaises(Polyfun.DomainMismatch, ChebfunArray.from_funs, [self.funs[0], other])
+        self.assertRaises(Polyfun.DomainMismatch, lambda: self.array + other)
+
+    def test_call_shape(self):
+        x = np.zeros((3, 4))
+        self.assertEqual(self.array(x).shape, (3, 4, len(self.funs)))
+
+    def test_getitem(self):
+        fun = self.array[2]
+        self.assertIsInstance(fun, Chebfun)
+        assert_close(fun, self.funs[2])
+        self.assertEqual(fun.size(), self.funs[2].size())
+        self.assert_same(self.array[1:3], self.funs[1:3])
+        self.assert_same(self.array[[4, 0]], [self.funs[4], self.funs[0]])
+        self.assertEqual(self.array[:2].size(), self.funs[1].size())
+
+    def test_iter(self):
+        for fun, expected in zip(self.array, self.funs):
+            assert_close(fun, expected)
+
+    def test_padding(self):
+        """
+        The coefficients beyond the size of each fun are zero.
+        """
+        coeffs = np.ones((5, 3))
+        array = ChebfunArray(coeffs, sizes=[2, 5, 1])
+        npt.assert_array_equal(array.coefficients()[:, 0], [1, 1, 0, 0, 0])
+        npt.assert_array_equal(array.coefficients()[:, 2], [1, 0, 0, 0, 0])
+        self.assertEqual(ChebfunArray(coeffs, sizes=[2, 3, 1]).size(), 3)
+
+    def test_from_coeff(self):
+        coeffs = np.zeros((10, 2))
+        coeffs[:3, 0] = 1.
+        coeffs[:7, 1] = 1.
+        array = ChebfunArray.from_coeff(coeffs)
+        npt.assert_array_equal(array.sizes(), [3, 7])
+        self.assertEqual(array.size(), 7)
+
+    def test_from_data(self):
+        array = ChebfunArray.from_data(self.array.values(), self.domain)
+        npt.assert_allclose(array(self.x), self.array(self.x), atol=1e-13)
+
+    def test_add(self):
+        self.assert_same(self.array + self.array, [f + f for f in self.funs])
+        self.assert_same(self.array + 3, [f + 3 for f in self.funs])
+        self.assert_same(2 + self.array, [2 + f for f in self.funs])
+        self.assert_same(self.array + self.funs[0], [f + self.funs[0] for f in self.funs])
+
+    def test_sub(self):
+        self.assert_same(self.array - self.funs[0], [f - self.funs[0] for f in self.funs])
+        self.assert_same(1 - self.array, [1 - f for f in self.funs])
+        self.assert_same(-self.array, [-f for f in self.funs])
+
+    def test_mul(self):
+        self.assert_same(self.array * self.array, [f * f for f in self.funs])
+        self.assert_same(3 * self.array, [3 * f for f in self.funs])
+        self.assert_same(self.array * self.funs[0], [f * self.funs[0] for f in self.funs])
+
+    def test_unsupported(self):
+        self.assertRaises(TypeError, lambda: self.array + 'a')
+        self.assertRaises(TypeError, lambda: self.array * [1, 2])
+        vector = Chebfun.from_function(lambda x: np.array([np.cos(x), np.sin(x)]).T, self.domain)
+        self.assertRaises(TypeError, lambda: self.array + vector)
+        self.assertRaises(TypeError, lambda: self.array * vector)
+
+    def test_sum(self):
+        npt.assert_allclose(self.array.sum(), [f.sum() for f in self.funs], atol=1e-14)
+
+    def test_integrate(self):
+        self.assert_same(self.array.integrate(), [f.integrate() for f in self.funs])
+
+    def test_differentiate(self):
+        self.assert_same(self.array.differentiate(), [f.differentiate() for f in self.funs], atol=1e-12)
+        self.assert_same(self.array.differentiate(2), [f.differentiate(2) for f in self.funs], atol=1e-11)
+
+    def test_roots(self):
+        roots = self.array.roots()
+        self.assertEqual(len(roots), len(self.funs))
+        for computed, fun in zip(roots, self.funs):
+            npt.assert_allclose(computed, fun.roots(), atol=1e-14)
+
+    def test_roots_subdivision(self):
+        funs = [Chebfun.from_function(lambda x, k=k: np.sin(k*x)) for k in [3, 300, 301]]
+        array = ChebfunArray.from_funs(funs)
+        for computed, fun in zip(array.roots(), funs):
+            npt.assert_allclose(computed, fun.roots(), atol=1e-14)
+        for computed, fun in zip(array.roots(solver='aberth', max_size=400), funs):
+            npt.assert_allclose(computed, fun.roots(), atol=1e-13)
+
+    def test_pickle(self):
+        import pickle
+        array = pickle.loads(pickle.dumps(self.array))
+        self.assert_same(array, self.funs)
+        self.assertEqual(array.tolerance(), self.array.tolerance())
+
+class TestFamily(unittest.TestCase):
+    def setUp(self):
+        self.g = lambda x, p: np.exp(np.sin(p*x))
+        self.params = np.linspace(1, 30, 7)
+
+    def test_same_as_from_function(self):
+        domain = [0., 2.]
+        array = ChebfunArray.from_family(self.g, self.params, domain)
+        funs = [Chebfun.from_function(lambda x, p=p: self.g(x, p), domain) for p in self.params]
+        npt.assert_array_equal(array.sizes(), [fun.size() for fun in funs])
+        x = np.linspace(0, 2, 30)
+        npt.assert_allclose(array(x), np.array([fun(x) for fun in funs]).T, atol=1e-12)
+
+    def test_active_parameters(self):
+        """
+        Only the parameters which have not converged are sampled again.
+        """
+        calls = []
+        def g(x, p):
+            calls.append((len(x), len(p)))
+            return self.g(x, p)
+        coeffs, sizes = ChebfunArray.family_dichotomy(g, [1., 40.])
+        self.assertEqual(calls[0], (5, 2))
+        self.assertEqual(calls[-1][1], 1)
+        self.assertLess(sizes[0], sizes[1])
+        self.assertEqual(coeffs.shape, (sizes[1], 2))
+        npt.assert_array_equal(coeffs[sizes[0]:, 0], 0.)
+
+    def test_no_convergence(self):
+        self.assertRaises(Polyfun.NoConvergence, ChebfunArray.family_dichotomy, self.g, [1., 1e4])
+
+    def test_N(self):
+        array = ChebfunArray.from_family(self.g, self.params, N=10)
+        fun = Chebfun.from_function(lambda x: self.g(x, self.params[-1]), N=10)
+        self.assertEqual(array.sizes()[-1], fun.size())
+
+    def test_constant_member(self):
+        """
+        The values of g are broadcast to all the parameters.
+        """
+        array = ChebfunArray.from_family(lambda x, p: np.cos(x), [1., 2.])
+        npt.assert_allclose(array(.3), np.cos(.3))
+
+    def test_plateau(self):
+        array = ChebfunArray.from_family(self.g, self.params, chop='plateau')
+        sizes = [Chebfun.from_function(lambda x: self.g(x, p), chop='plateau').size() for p in self.params]
+        npt.assert_array_equal(array.sizes(), sizes)
+        self.assertEqual(array.size(), max(sizes))
+
+    def test_tolerance(self):
+        coarse = ChebfunArray.from_family(self.g, self.params, tol=1e-6)
+        fine = ChebfunArray.from_family(self.g, self.params)
+        self.assertEqual(coarse.tolerance(), 1e-6)
+        self.assertTrue(np.all(coarse.sizes() <= fine.sizes()))
+        self.assertLess(coarse.size(), fine.size())
+        for result in [coarse + fine, coarse*coarse, coarse.differentiate(), coarse[:2], -coarse]:
+            self.assertEqual(result.tolerance(), 1e-6)
+        self.assertEqual(coarse[0].tolerance(), 1e-6)
+        funs = [Chebfun.from_function(np.sin, tol=1e-6), Chebfun.from_function(np.cos)]
+        self.assertEqual(ChebfunArray.from_funs(funs).tolerance(), 1e-6)
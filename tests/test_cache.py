@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# coding: UTF-8
+from __future__ import division
+
+from pychebfun import *
+from pychebfun.cache import LRUCache, array_cache, function_key, _code_digest
+
+import numpy as np
+import numpy.testing as npt
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from .tools import *
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LRUCache(maxsize=3)
+
+    def test_stats(self):
+        for key in [1, 2, 1, 3, 4, 1]:
+            self.cache.get(key, lambda: key*10)
+        self.assertEqual(self.cache.stats(), {'hits': 2, 'misses': 4, 'evictions': 1, 'size': 3, 'maxsize': 3})
+        # 2 was the least recently used
+        self.assertNotIn(2, self.cache)
+        self.assertEqual(self.cache.get(4, lambda: None), 40)
+
+    def test_resize(self):
+        for key in range(3):
+            self.cache.get(key, lambda: key)
+        self.cache.resize(1)
+        self.assertEqual(len(self.cache), 1)
+        self.assertIn(2, self.cache)
+        self.assertEqual(self.cache.stats()['evictions'], 2)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0, 'maxsize': 1})
+
+    def test_threads(self):
+        """
+        Concurrent accesses keep the cache consistent.
+        """
+        results = []
+        def work():
+            for key in range(100):
+                results.append(self.cache.get(key % 5, lambda: key % 5))
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 800)
+        self.assertEqual(stats['size'], 3)
+        self.assertEqual(sorted(results), sorted(key % 5 for _ in range(8) for key in range(100)))
+
+class TestArrayCache(unittest.TestCase):
+    def test_shared(self):
+        """
+        The Chebyshev points and weights are computed once, and read-only.
+        """
+        for compute in [Chebfun.interpolation_points, Chebfun.barycentric_weights, Chebfun.quadrature_weights]:
+            array = compute(37)
+            self.assertIs(compute(37), array)
+            self.assertFalse(array.flags.writeable)
+
+    def test_hits(self):
+        Chebfun.from_function(np.exp)
+        hits = array_cache.stats()['hits']
+        p = Chebfun.from_function(np.exp)
+        p(.5)
+        self.assertGreater(array_cache.stats()['hits'], hits)
+
+    def test_quadrature_weights(self):
+        """
+        The integral of the Chebyshev polynomials is computed exactly.
+        """
+        N = 17
+        weights = Chebfun.quadrature_weights(N)
+        x = Chebfun.interpolation_points(N)
+        for k in range(N):
+            Tk = np.cos(k*np.arccos(x))
+            expected = 0. if k % 2 else 2/(1-k**2)
+            npt.assert_allclose(np.dot(weights, Tk), expected, atol=1e-14)
+        npt.assert_allclose(Chebfun.quadrature_weights(1), [2.])
+        npt.assert_allclose(Chebfun.quadrature_weights(2), [1., 1.])
+
+def model(x):
+    model.calls += 1
+    return np.exp(np.sin(3*x))
+model.calls = 0
+
+class Frequency(object):
+    def __init__(self, frequency):
+        self.frequency = frequency
+
+    def sin(self, x):
+        return np.sin(self.frequency*x)
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = DiskCache(os.path.join(self.folder, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_memoize(self):
+        """
+        The function is only sampled the first time.
+        """
+        calls = model.calls
+        p = Chebfun.from_function(model, domain=[0, 2], cache=self.cache)
+        self.assertGreater(model.calls, calls)
+        calls = model.calls
+        q = chebfun(model, domain=[0, 2], cache=DiskCache(self.cache.directory))
+        self.assertEqual(model.calls, calls)
+        npt.assert_array_equal(q.coefficients(), p.coefficients())
+        npt.assert_array_equal(q.domain(), p.domain())
+        self.assertTrue(q.converged())
+        self.assertEqual(q.tail(), p.tail())
+        self.assertEqual(self.cache.stats()['size'], 1)
+
+    def test_parameters(self):
+        """
+        The entries depend on the domain, N and the tolerance.
+        """
+        Chebfun.from_function(model, cache=self.cache)
+        Chebfun.from_function(model, domain=[0, 1], cache=self.cache)
+        Chebfun.from_function(model, N=10, cache=self.cache)
+        p = Chebfun.from_function(model, tol=1e-6, cache=self.cache)
+        q = Chebfun.from_function(model, tol=1e-6, cache=self.cache)
+        self.assertEqual(q.tolerance(), 1e-6)
+        self.assertEqual(q.size(), p.size())
+        stats = self.cache.stats()
+        self.assertEqual(stats['size'], 4)
+        self.assertEqual((stats['hits'], stats['misses']), (1, 4))
+
+    def test_unconverged(self):
+        """
+        Funs which did not converge within their budget are not stored.
+        """
+        Chebfun.from_function(model, max_evals=10, cache=self.cache)
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_key(self):
+        self.assertRaises(ValueError, Chebfun.from_function, lambda x: x, cache=self.cache)
+        Chebfun.from_function(lambda x: np.cos(x), cache=self.cache, key='cos')
+        p = Chebfun.from_function(lambda x: 1/0, cache=self.cache, key='cos')
+        assert_close(p, np.cos)
+        self.assertTrue(function_key(model).startswith('{}.model@'.format(__name__)))
+        # ufuncs have no module
+        self.assertRaises(ValueError, function_key, np.exp)
+        self.assertRaises(ValueError, Chebfun.from_function, np.exp, cache=self.cache)
+        self.assertEqual(function_key(np.exp, key='exp'), 'exp')
+
+    def test_methods(self):
+        """
+        Bound methods depend on their instance, so they need a key.
+        """
+        one, five = Frequency(1.), Frequency(5.)
+        self.assertRaises(ValueError, function_key, one.sin)
+        self.assertRaises(ValueError, Chebfun.from_function, five.sin, cache=self.cache)
+        Chebfun.from_function(one.sin, cache=self.cache, key='sin 1')
+        p = Chebfun.from_function(five.sin, cache=self.cache, key='sin 5')
+        npt.assert_allclose(p(.3), np.sin(1.5), rtol=1e-13)
+
+    def test_code(self):
+        """
+        The derived key changes with the code of the function.
+        """
+        def first(x):
+            return np.sin(x) + 1.
+        def second(x):
+            return np.sin(x) + 2.
+        self.assertNotEqual(_code_digest(first.__code__), _code_digest(second.__code__))
+        self.assertEqual(function_key(model), function_key(model))
+
+    def test_invalidate_function(self):
+        """
+        All the entries of one function are removed together.
+        """
+        Chebfun.from_function(model, cache=self.cache)
+        Chebfun.from_function(model, domain=[0, 1], cache=self.cache)
+        Chebfun.from_function(np.cos, cache=self.cache, key='cos')
+        self.cache.invalidate(function=model)
+        self.assertEqual(self.cache.stats()['size'], 1)
+        self.cache.invalidate(function='cos')
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_invalidate(self):
+        Chebfun.from_function(np.cos, cache=self.cache, key='cos')
+        Chebfun.from_function(np.sin, cache=self.cache, key='sin')
+        entry = ('cos', [-1., 1.], None, 'classic', get_tolerance())
+        self.assertIsNotNone(self.cache.get(entry))
+        self.cache.invalidate(entry)
+        self.assertIsNone(self.cache.get(entry))
+        self.assertEqual(self.cache.stats()['size'], 1)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_temporary_files(self):
+        """
+        No temporary file is left behind, even if writing fails.
+        """
+        class Unsaveable(object):
+            def __array__(self, *args):
+                raise RuntimeError('unsaveable')
+        self.cache.set('key', {'data': np.zeros(10)})
+        self.assertRaises(RuntimeError, self.cache.set, 'other', {'data': Unsaveable()})
+        self.assertEqual(os.listdir(self.cache.directory), [os.path.basename(self.cache.path('key'))])
+
+    def test_eviction(self):
+        """
+        The least recently used entries are removed when the cache is too large.
+        """
+        arrays = {'data': np.zeros(1000)}
+        for index in range(3):
+            self.cache.set(index, arrays)
+            path = self.cache.path(index)
+            os.utime(path, (index, index))
+        size = os.path.getsize(path)
+        self.cache.get(0) # most recently used
+        self.cache.max_bytes = 2*size
+        self.cache.set(3, arrays)
+        self.assertIsNotNone(self.cache.get(0))
+        self.assertIsNone(self.cache.get(1))
+        self.assertIsNone(self.cache.get(2))
+        self.assertIsNotNone(self.cache.get(3))
+        self.assertEqual(self.cache.stats()['evictions'], 2)
@@ -4,12 +4,17 @@
 from __future__ import division
 import os
 import sys
+import shutil
+import tempfile
 
 import unittest
 import numpy as np
 import numpy.testing as npt
+import numpy.polynomial as poly
 
 from pychebfun import *
+from pychebfun.cache import array_cache
+from pychebfun.polyfun import standard_chop
 from .tools import *
 
 np.seterr(all='raise')
@@ -199,6 +204,469 @@ class Test_sinsinexp(unittest.TestCase):
         """
         assert_close(self.p, Chebfun.from_function(self.p))
 
+class TestDichotomy(unittest.TestCase):
+    def test_evaluated_once(self):
+        """
+        Each Chebyshev point is evaluated only once during the dichotomy.
+        """
+        evaluated = []
+        def counted(x):
+            evaluated.extend(x)
+            return f(x)
+        p = Chebfun.from_function(counted)
+        self.assertEqual(len(evaluated), len(set(evaluated)))
+        N = len(evaluated) - 1
+        npt.assert_allclose(np.sort(evaluated), np.sort(Chebfun.interpolation_points(N+1)))
+        assert_close(p, Chebfun.from_function(f))
+
+    def test_refine_samples(self):
+        """
+        Refined samples coincide with samples on the finer grid.
+        """
+        N = 16
+        coarse = Chebfun.sample_function(circle, N)
+        refined = Chebfun.refine_samples(circle, coarse)
+        npt.assert_array_equal(refined, Chebfun.sample_function(circle, 2*N))
+
+    def test_max_evals(self):
+        """
+        The construction stops before exceeding the number of evaluations,
+        and returns an unconverged fun.
+        """
+        evaluated = []
+        def counted(x):
+            evaluated.extend(x)
+            return runge(x)
+        p = Chebfun.from_function(counted, max_evals=100)
+        self.assertLessEqual(len(evaluated), 100)
+        self.assertEqual(p.size(), 65)
+        self.assertFalse(p.converged())
+        self.assertGreater(p.tail(), 1e-6)
+        npt.assert_allclose(p(.3), runge(.3), atol=10*p.tail())
+        q = Chebfun.from_function(runge, max_evals=1000)
+        self.assertTrue(q.converged())
+        self.assertLess(q.tail(), 1e-14)
+        assert_close(q, Chebfun.from_function(runge))
+
+    def test_first_level(self):
+        """
+        The first level is always sampled.
+        """
+        p = Chebfun.from_function(f, max_evals=1)
+        self.assertEqual(p.size(), 5)
+        self.assertFalse(p.converged())
+
+    def test_time_limit(self):
+        """
+        A function which is too slow gives an unconverged fun instead of an exception.
+        """
+        import time
+        def slow(x):
+            time.sleep(.01)
+            return np.sign(x)
+        p = Chebfun.from_function(slow, time_limit=.05)
+        self.assertFalse(p.converged())
+        self.assertLess(p.size(), 2**11)
+        p = chebfun(runge, time_limit=10.)
+        self.assertTrue(p.converged())
+
+    def test_converged(self):
+        """
+        Funs which are not constructed from functions have no tail.
+        """
+        self.assertTrue(Chebfun.from_function(f).converged())
+        self.assertFalse(Chebfun.from_function(runge, N=10).converged())
+        self.assertTrue(Chebfun([1., 2.]).converged())
+        self.assertIsNone(Chebfun([1., 2.]).tail())
+
+    def test_refine(self):
+        """
+        Refining continues the dichotomy: only the new points are evaluated.
+        """
+        evaluated = []
+        def counted(x):
+            evaluated.extend(x)
+            return runge(x)
+        p = Chebfun.from_function(counted, domain=[0, 2], max_evals=40, refinable=True)
+        self.assertFalse(p.converged())
+        coarse = len(evaluated)
+        size = p.size()
+        q = p.refine()
+        self.assertIsNot(q, p)
+        self.assertTrue(q.converged())
+        self.assertEqual(len(evaluated), len(set(evaluated)))
+        assert_close(q, Chebfun.from_function(runge, domain=[0, 2]))
+        npt.assert_allclose(q.coefficients(), q.polyfit(q.values()), atol=1e-15)
+        self.assertGreater(len(evaluated), coarse)
+        # the original fun is unchanged
+        self.assertFalse(p.converged())
+        self.assertEqual(p.size(), size)
+        refined = len(evaluated)
+        q.refine()
+        self.assertEqual(len(evaluated), refined)
+
+    def test_refine_tolerance(self):
+        """
+        A fun constructed with a larger tolerance can be refined to a smaller one.
+        """
+        p = Chebfun.from_function(runge, tol=1e-4, refinable=True)
+        q = p.refine(tol=emach)
+        self.assertEqual(q.tolerance(), emach)
+        self.assertGreater(q.size(), p.size())
+        assert_close(q, Chebfun.from_function(runge))
+
+    def test_refine_plateau(self):
+        p = Chebfun.from_function(runge, N=20, chop='plateau', refinable=True)
+        self.assertFalse(p.converged())
+        q = p.refine()
+        self.assertTrue(q.converged())
+        npt.assert_allclose(q(.3), runge(.3), rtol=1e-13)
+
+    def test_warm_start(self):
+        """
+        A warm start gives the same fun as a cold start, with fewer levels.
+        """
+        calls = []
+        def counted(x):
+            calls.append(len(x))
+            return runge(x)
+        cold = Chebfun.from_function(runge)
+        p = Chebfun.from_function(counted, start=cold)
+        self.assertEqual(len(calls), 1)
+        assert_close(p, cold)
+        self.assertEqual(p.size(), cold.size())
+        # search down from a larger size, for free
+        del calls[:]
+        p = Chebfun.from_function(counted, start=1000)
+        self.assertEqual(calls, [1025])
+        self.assertEqual(p.size(), cold.size())
+        # search up from a smaller size
+        del calls[:]
+        p = chebfun(counted, start=10)
+        self.assertEqual(calls, [17] + [2**k for k in range(4, 3+len(calls))])
+        self.assertEqual(p.size(), cold.size())
+
+    def test_warm_start_budget(self):
+        """
+        A warm start does not sample more points than max_evals allows.
+        """
+        evaluated = []
+        def counted(x):
+            evaluated.extend(x)
+            return runge(x)
+        p = Chebfun.from_function(counted, start=1000, max_evals=10)
+        self.assertLessEqual(len(evaluated), 10)
+        self.assertFalse(p.converged())
+        del evaluated[:]
+        p = Chebfun.from_function(counted, start=1000, max_evals=100)
+        self.assertLessEqual(len(evaluated), 100)
+        self.assertEqual(p.size(), 65)
+        self.assertFalse(p.converged())
+
+    def test_warm_start_plateau(self):
+        cold = Chebfun.from_function(runge, chop='plateau')
+        for start in [cold, 10, 1000]:
+            p = Chebfun.from_function(runge, chop='plateau', start=start)
+            self.assertEqual(p.size(), cold.size())
+
+    def test_refine_derived(self):
+        """
+        Only funs constructed from a function with refinable=True can be refined.
+        """
+        self.assertRaises(ValueError, Chebfun.from_function(f).refine)
+        p = chebfun(f, refinable=True)
+        p.refine()
+        self.assertRaises(ValueError, (p + p).refine)
+        self.assertRaises(ValueError, Chebfun([1., 2.]).refine)
+
+def scalar_runge(x):
+    """
+    Runge function, accepting only a scalar.
+    """
+    return 1./(1+25*float(x)**2)
+
+class TestSampling(unittest.TestCase):
+    """
+    Construction from functions which are not vectorized, possibly in parallel.
+    """
+    def setUp(self):
+        self.expected = Chebfun.from_function(runge, domain=[0., 2.])
+
+    def test_not_vectorized(self):
+        self.assertRaises(TypeError, Chebfun.from_function, scalar_runge)
+        p = Chebfun.from_function(scalar_runge, domain=[0., 2.], vectorized=False)
+        npt.assert_array_equal(p.values(), self.expected.values())
+
+    def test_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(4) as executor:
+            p = chebfun(scalar_runge, domain=[0., 2.], vectorized=False, executor=executor)
+            npt.assert_array_equal(p.values(), self.expected.values())
+            q = Chebfun.from_function(runge, domain=[0., 2.], executor=executor, chunksize=7)
+            npt.assert_array_equal(q.values(), self.expected.values())
+
+    def test_processes(self):
+        try:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(2)
+        except (ImportError, NotImplementedError, OSError):
+            self.skipTest('process pools are not available')
+        with executor:
+            p = Chebfun.from_function(scalar_runge, domain=[0., 2.], N=20, vectorized=False, executor=executor,
+                                      refinable=True)
+            p = p.refine(executor=executor)
+        npt.assert_allclose(p.values(), self.expected.values())
+
+    def test_chunks(self):
+        """
+        The points are evaluated by chunks, in order.
+        """
+        x = np.linspace(0, 1, 10)
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(2) as executor:
+            values = evaluate_function(lambda t: [t, 2*t], x, vectorized=False, executor=executor, chunksize=3)
+        npt.assert_array_equal(values, np.array([x, 2*x]).T)
+
+    def test_refine(self):
+        """
+        A fun of a function which is not vectorized is refined pointwise.
+        """
+        p = Chebfun.from_function(scalar_runge, domain=[0., 2.], N=20, vectorized=False, refinable=True)
+        p = p.refine()
+        npt.assert_array_equal(p.values(), self.expected.values())
+
+class TestChop(unittest.TestCase):
+    def test_standard_chop(self):
+        """
+        The series is cut where the decay of its coefficients levels off.
+        """
+        k = np.arange(60)
+        coeffs = np.maximum(10.**-k, 1e-15*np.cos(k))
+        cutoff = standard_chop(coeffs)
+        self.assertGreater(cutoff, 12)
+        self.assertLess(cutoff, 18)
+        self.assertEqual(standard_chop(coeffs[:16]), 16)
+        self.assertEqual(standard_chop(np.zeros(20)), 1)
+        self.assertEqual(standard_chop(np.ones(40)), 40)
+
+    def test_columns(self):
+        k = np.arange(80)
+        coeffs = np.array([np.maximum(2.**-k, 1e-14*np.sin(k)), 3.**-k, np.zeros(80), np.ones(80)]).T
+        npt.assert_array_equal(standard_chop(coeffs), [standard_chop(c) for c in coeffs.T])
+
+    def test_plateau(self):
+        """
+        The plateau rule removes the noise which the classic rule keeps.
+        """
+        g = lambda x: np.exp(x) + 1e-12*np.sin(1e5*x+1)**3
+        classic = Chebfun.from_function(g)
+        plateau = Chebfun.from_function(g, chop='plateau')
+        self.assertLess(plateau.size(), classic.size())
+        x = np.linspace(-1, 1, 100)
+        npt.assert_allclose(plateau(x), np.exp(x), atol=1e-11)
+        self.assertEqual(chebfun(g, chop='plateau').size(), plateau.size())
+
+    def test_plateau_vector(self):
+        p = Chebfun.from_function(circle, chop='plateau')
+        x = np.linspace(-1, 1, 100)
+        npt.assert_allclose(p(x), circle(x), atol=1e-13)
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, Chebfun.from_function, f, chop='other')
+
+class TestTolerance(unittest.TestCase):
+    def setUp(self):
+        self.coarse = Chebfun.from_function(f, tol=1e-6)
+
+    def test_from_function(self):
+        fine = Chebfun.from_function(f)
+        self.assertEqual(fine.tolerance(), get_tolerance())
+        self.assertEqual(self.coarse.tolerance(), 1e-6)
+        self.assertLess(self.coarse.size(), fine.size())
+        x = np.linspace(-1, 1, 100)
+        npt.assert_allclose(self.coarse(x), f(x), atol=1e-5)
+        self.assertEqual(chebfun(f, tol=1e-6).size(), self.coarse.size())
+
+    def test_context(self):
+        default = get_tolerance()
+        with tolerance(1e-6):
+            self.assertEqual(get_tolerance(), 1e-6)
+            p = Chebfun.from_function(f)
+        self.assertEqual(get_tolerance(), default)
+        self.assertEqual(p.tolerance(), 1e-6)
+        self.assertEqual(p.size(), self.coarse.size())
+        try:
+            with tolerance(1e-3):
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        self.assertEqual(get_tolerance(), default)
+
+    def test_set_tolerance(self):
+        default = get_tolerance()
+        set_tolerance(1e-8)
+        try:
+            self.assertEqual(Chebfun.from_function(f).tolerance(), 1e-8)
+        finally:
+            set_tolerance(default)
+        self.assertRaises(ValueError, set_tolerance, 0.)
+
+    def test_propagation(self):
+        """
+        The results of operations keep the largest tolerance of their operands.
+        """
+        p = self.coarse
+        fine = Chebfun.from_function(np.cos)
+        results = [p + 1, 2*p, p*p, p + fine, fine*p, -p, p - fine, p/(2+fine), np.exp(p), abs(p+10), p**2,
+                   p.differentiate(), p.integrate(), p.restrict([0., .5]), p[0], Chebfun.from_fun(p)]
+        for result in results:
+            self.assertEqual(result.tolerance(), 1e-6)
+        self.assertEqual((fine*fine).tolerance(), get_tolerance())
+
+    def test_coarse_product(self):
+        """
+        Coarse products are smaller.
+        """
+        fine = Chebfun.from_function(f)
+        self.assertLess((self.coarse*self.coarse).size(), (fine*fine).size())
+
+    def test_roots(self):
+        g = lambda x: np.sin(300*x)
+        coarse = Chebfun.from_function(g, tol=1e-8)
+        n = int(300/np.pi)
+        npt.assert_allclose(coarse.roots(), np.arange(-n, n+1)*np.pi/300, atol=1e-7)
+
+    def test_plateau(self):
+        p = Chebfun.from_function(f, tol=1e-6, chop='plateau')
+        self.assertLess(p.size(), Chebfun.from_function(f, chop='plateau').size())
+        x = np.linspace(-1, 1, 100)
+        npt.assert_allclose(p(x), f(x), atol=1e-5)
+
+class TestMemoize(unittest.TestCase):
+    """
+    The coefficients are computed at most once.
+    """
+    def setUp(self):
+        self.polyfit = Chebfun.__dict__['polyfit']
+        self.calls = []
+        polyfit = Chebfun.polyfit
+        def counted(cls, sampled, workers=None):
+            if len(sampled) > 1: # constants are not transformed
+                self.calls.append(len(sampled))
+            return polyfit(sampled, workers)
+        Chebfun.polyfit = classmethod(counted)
+        self.p = Chebfun(f(Chebfun.interpolation_points(33)))
+
+    def tearDown(self):
+        Chebfun.polyfit = self.polyfit
+
+    def test_coefficients(self):
+        c1 = self.p.coefficients()
+        c2 = self.p.coefficients()
+        self.assertIs(c1, c2)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_operations(self):
+        self.p.sum()
+        self.p.integrate()
+        self.p.differentiate()
+        self.p + self.p
+        self.assertEqual(len(self.calls), 1)
+
+    def test_from_coeff(self):
+        coeffs = np.random.rand(10)
+        c = Chebfun.from_coeff(coeffs, prune=False)
+        npt.assert_array_equal(c.coefficients(), coeffs)
+        self.assertEqual(len(self.calls), 0)
+        # the fun does not change with the array of the caller
+        value, integral = c(.3), c.integrate()(1.)
+        coeffs[0] = 100.
+        self.assertNotEqual(c.coefficients()[0], 100.)
+        self.assertEqual(c(.3), value)
+        self.assertEqual(c.integrate()(1.), integral)
+
+    def test_neg(self):
+        self.p.coefficients()
+        c = -self.p
+        npt.assert_allclose(c.coefficients(), -self.p.coefficients())
+        self.assertEqual(len(self.calls), 1)
+
+class TestLazyState(unittest.TestCase):
+    """
+    Funs only store their essential state.
+    """
+    def test_slots(self):
+        p = Chebfun.from_function(f)
+        self.assertFalse(hasattr(p, '__dict__'))
+        with self.assertRaises(AttributeError):
+            p.other = 1.
+
+    def test_weakref(self):
+        import weakref
+        p = Chebfun.from_function(f)
+        self.assertIs(weakref.ref(p)(), p)
+
+    def test_interpolator(self):
+        p = Chebfun(f(Chebfun.interpolation_points(9)))
+        self.assertIsNone(p._p)
+        self.assertEqual(p.size(), 9)
+        p(.5)
+        self.assertIsNotNone(p._p)
+        self.assertIs(p.p, p._p)
+
+    def test_vscale(self):
+        p = Chebfun([1., -3., 2.])
+        self.assertIsNone(p._vscale)
+        self.assertEqual(p.vscale(), 3.)
+        self.assertEqual(Chebfun([1., -3., 2.], vscale=5.).vscale(), 5.)
+
+def integral(fun):
+    return fun.sum()
+
+def sine(w):
+    return Chebfun.from_function(lambda x: np.sin(w*x), domain=[0, 2])
+
+class TestPickle(unittest.TestCase):
+    def test_round_trip(self):
+        """
+        Unpickled funs are equal to the original ones, and keep their attributes.
+        """
+        import pickle
+        p = Chebfun.from_function(runge, domain=[0, 2], tol=1e-8, max_evals=40, refinable=True)
+        q = pickle.loads(pickle.dumps(p, pickle.HIGHEST_PROTOCOL))
+        npt.assert_array_equal(q.values(), p.values())
+        npt.assert_array_equal(q.domain(), p.domain())
+        self.assertEqual(q.vscale(), p.vscale())
+        self.assertEqual(q.tolerance(), p.tolerance())
+        self.assertFalse(q.converged())
+        self.assertEqual(q.tail(), p.tail())
+        npt.assert_allclose(q(np.linspace(0, 2, 7)), p(np.linspace(0, 2, 7)), rtol=1e-14)
+        npt.assert_allclose(q.coefficients(), p.coefficients(), atol=1e-15)
+        self.assertRaises(ValueError, q.refine)
+
+    def test_vector(self):
+        import pickle
+        p = Chebfun.from_function(lambda x: np.array([np.cos(x), np.sin(x)]).T)
+        q = pickle.loads(pickle.dumps(p))
+        npt.assert_array_equal(q.values(), p.values())
+
+    def test_process_pool(self):
+        """
+        Funs are sent to and received from worker processes.
+        """
+        try:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(2)
+        except (ImportError, NotImplementedError, OSError):
+            self.skipTest('process pools are not available')
+        funs = [sine(w) for w in [1., 2., 3.]]
+        with executor:
+            sums = list(executor.map(integral, funs))
+            received = list(executor.map(sine, [1., 2., 3.]))
+        npt.assert_allclose(sums, [fun.sum() for fun in funs])
+        for fun, other in zip(received, funs):
+            assert_close(fun, other, xs+1)
+
 class TestDifferentiate(unittest.TestCase):
     def test_diffquad(self):
         """
@@ -317,6 +785,276 @@ class TestSimple(unittest.TestCase):
         c = Chebfun.identity()
         assert_close(c, lambda x:x)
 
+class TestClenshaw(unittest.TestCase):
+    """
+    The Clenshaw recurrence agrees with the barycentric formula.
+    """
+    def check(self, p, x):
+        t = p._ab_to_ui(x)
+        expected = p.p(t)
+        computed = Chebfun.clenshaw(p.coefficients(), t)
+        self.assertEqual(np.shape(computed), np.shape(expected))
+        npt.assert_allclose(computed, expected, atol=1e-13)
+
+    def test_scalar(self):
+        p = Chebfun.from_function(f)
+        self.check(p, .3)
+        self.check(p, xs)
+        self.check(p, xs.reshape(10, -1))
+
+    def test_vector(self):
+        c = Chebfun.from_function(circle)
+        self.check(c, .3)
+        self.check(c, xs)
+
+    def test_complex(self):
+        c = np.exp(1j*Chebfun.identity())
+        self.check(c, xs)
+
+    def test_constant(self):
+        c = Chebfun(2.)
+        self.check(c, xs)
+
+    def test_call(self):
+        """
+        Both methods are used by __call__, and the endpoints are exact.
+        """
+        p = Chebfun.from_function(f)
+        self.assertTrue(p._use_clenshaw(len(xs)))
+        self.assertFalse(p._use_clenshaw(1))
+        self.assertTrue(Chebfun.identity()._use_clenshaw(200))
+        self.assertFalse(Chebfun.basis(30)._use_clenshaw(500))
+        x = np.linspace(-1, 1, 2*p.clenshaw_min_points)
+        values = p(x)
+        npt.assert_allclose(values, f(x), atol=1e-13)
+        self.assertEqual(values[0], p.values()[-1])
+        self.assertEqual(values[-1], p.values()[0])
+
+class TestEvaluate(unittest.TestCase):
+    """
+    Chunked evaluation.
+    """
+    def setUp(self):
+        self.p = Chebfun.from_function(f)
+        self.x = np.linspace(-1, 1, 1001)
+
+    def test_evaluate(self):
+        result = self.p.evaluate(self.x, chunk_size=100)
+        npt.assert_allclose(result, self.p(self.x))
+
+    def test_shape(self):
+        x = self.x[:1000].reshape(10, 100)
+        result = self.p.evaluate(x, chunk_size=33)
+        self.assertEqual(result.shape, x.shape)
+        npt.assert_allclose(result, self.p(x))
+
+    def test_vector(self):
+        c = Chebfun.from_function(circle)
+        result = c.evaluate(self.x, chunk_size=100)
+        self.assertEqual(result.shape, (len(self.x), 2))
+        npt.assert_allclose(result, c(self.x), atol=1e-14)
+
+    def test_out(self):
+        out = np.zeros_like(self.x)
+        result = self.p.evaluate(self.x, out=out, chunk_size=100)
+        self.assertIs(result, out)
+        npt.assert_allclose(out, self.p(self.x))
+        with self.assertRaises(ValueError):
+            self.p.evaluate(self.x, out=np.zeros(3))
+        x = self.x[:1000].reshape(10, 100)
+        with self.assertRaises(ValueError):
+            self.p.evaluate(x, out=np.zeros((100, 10)).T)
+
+    def test_memmap(self):
+        folder = tempfile.mkdtemp()
+        x = np.memmap(os.path.join(folder, 'x'), dtype=float, mode='w+', shape=self.x.shape)
+        x[:] = self.x
+        out = np.memmap(os.path.join(folder, 'out'), dtype=float, mode='w+', shape=self.x.shape)
+        self.p.evaluate(x, out=out, chunk_size=100)
+        out.flush()
+        result = np.memmap(os.path.join(folder, 'out'), dtype=float, mode='r', shape=self.x.shape)
+        npt.assert_allclose(result, self.p(self.x))
+        del x, out, result
+        shutil.rmtree(folder)
+
+    def test_iter(self):
+        chunks = list(self.p.iter_evaluate(self.x, chunk_size=300))
+        self.assertEqual([len(chunk) for chunk in chunks], [300, 300, 300, 101])
+        npt.assert_allclose(np.concatenate(chunks), self.p(self.x))
+
+class TestSampleUniform(unittest.TestCase):
+    def test_values(self):
+        p = Chebfun.from_function(f, domain=[0., 2.])
+        x, values = p.sample_uniform(200)
+        npt.assert_allclose(x, np.linspace(0., 2., 200))
+        npt.assert_allclose(values, f(x), atol=1e-13)
+        self.assertEqual(values[0], p.values()[-1])
+        self.assertEqual(values[-1], p.values()[0])
+
+    def test_endpoints(self):
+        """
+        The endpoints are exactly those of the domain.
+        """
+        domain = [.1, .7]
+        p = Chebfun.from_function(f, domain=domain)
+        x, values = p.sample_uniform(30)
+        self.assertEqual((x[0], x[-1]), (.1, .7))
+        x = get_linspace(domain, 30)
+        self.assertEqual((x[0], x[-1]), (.1, .7))
+        npt.assert_allclose(x, np.linspace(.1, .7, 30))
+
+    def test_vector(self):
+        c = Chebfun.from_function(circle)
+        x, values = c.sample_uniform(50)
+        self.assertEqual(values.shape, (50, 2))
+        npt.assert_allclose(values, circle(x), atol=1e-14)
+
+    def test_points_not_cached(self):
+        """
+        The equispaced points are cheap to compute, so they are not kept in the array cache.
+        """
+        p = Chebfun.identity()
+        p.sample_uniform(12345)
+        size = array_cache.stats()['size']
+        x, values = p.sample_uniform(12346)
+        self.assertEqual(array_cache.stats()['size'], size)
+        self.assertTrue(x.flags.writeable)
+
+class TestRoots(unittest.TestCase):
+    def test_restrict_coefficients(self):
+        """
+        The coefficients of a restriction represent the series on the subinterval.
+        """
+        p = Chebfun.from_function(f)
+        lo, hi = -.3, .6
+        coeffs = Chebfun.restrict_coefficients(p.coefficients(), [lo, hi])
+        self.assertEqual(len(coeffs), p.size())
+        s = np.linspace(-1, 1, 100)
+        npt.assert_allclose(Chebfun.clenshaw(coeffs, s), f(0.5*(hi-lo)*s + 0.5*(hi+lo)), atol=1e-13)
+
+    def test_has_no_roots(self):
+        self.assertTrue(Chebfun.has_no_roots(np.array([2., .5, -.5, .9])))
+        self.assertFalse(Chebfun.has_no_roots(np.array([2., .5, -.5, 1.])))
+
+    def test_large(self):
+        """
+        Roots of a fun which needs several subdivisions.
+        """
+        k = 300
+        p = Chebfun.from_function(lambda x: np.sin(k*x))
+        self.assertGreater(p.size(), 2*Chebfun.max_root_size)
+        roots = np.sort(p.roots())
+        n = int(k/np.pi)
+        npt.assert_allclose(roots, np.arange(-n, n+1)*np.pi/k, atol=1e-13)
+
+    def test_split_point(self):
+        """
+        A root at a split point is only returned once.
+        """
+        s = Chebfun.split_point
+        k = 300
+        p = Chebfun.from_function(lambda x: np.sin(k*(x-s)))
+        roots = p.roots()
+        j = np.arange(np.ceil((-1-s)*k/np.pi), np.floor((1-s)*k/np.pi)+1)
+        npt.assert_allclose(roots, s + j*np.pi/k, atol=1e-13)
+
+    def test_executor(self):
+        from concurrent.futures import ThreadPoolExecutor
+        p = Chebfun.from_function(lambda x: np.sin(300*x))
+        expected = p.roots()
+        with ThreadPoolExecutor(4) as executor:
+            npt.assert_array_equal(p.roots(executor=executor), expected)
+        npt.assert_array_equal(p.roots(workers=4), expected)
+
+    def test_sorted(self):
+        p = Chebfun.from_function(lambda x: np.sin(300*x))
+        roots = p.roots()
+        npt.assert_array_equal(roots, np.sort(roots))
+
+    def test_batch(self):
+        """
+        Batched roots of series of various sizes.
+        """
+        rs = [np.array([-.5, .3]), np.array([.1]), np.array([-.9, 0., .2, .7])]
+        coeffs = [poly.chebyshev.chebfromroots(r) for r in rs]
+        coeffs.append(np.array([2.])) # constant
+        coeffs.append(np.concatenate([coeffs[1], [0., 0.]])) # trailing zeros
+        coeffs.append(poly.chebyshev.chebfromroots([.6, -.4])) # same size as the first one
+        roots = Chebfun.batch_roots(coeffs)
+        self.assertEqual(len(roots), len(coeffs))
+        for computed, expected in zip(roots, rs + [[], rs[1], [.6, -.4]]):
+            npt.assert_allclose(np.sort(computed), np.sort(expected), atol=1e-14)
+
+    def test_linear(self):
+        x = Chebfun.identity()
+        npt.assert_allclose(x.roots(), 0., atol=1e-15)
+        npt.assert_allclose((2*x - 1).roots(), .5)
+
+    def test_colleague_matrices(self):
+        coeffs = np.random.randn(5, 7)
+        C = Chebfun.colleague_matrices(coeffs)
+        self.assertEqual(C.shape, (5, 6, 6))
+        for c, matrix in zip(coeffs, C):
+            npt.assert_allclose(np.sort_complex(np.linalg.eigvals(matrix)), np.sort_complex(poly.chebyshev.chebroots(c)), atol=1e-10)
+
+    def test_no_roots(self):
+        p = Chebfun.from_function(lambda x: 2 + np.sin(100*x))
+        self.assertEqual(len(p.roots()), 0)
+
+    def test_aberth(self):
+        """
+        The Aberth iteration finds the same roots as the colleague matrix.
+        """
+        coeffs = list(np.random.randn(4, 80))
+        coeffs.append(poly.chebyshev.chebfromroots([-.9, 0., .2, .7]))
+        coeffs.append(np.array([-.3, 1.])) # linear
+        coeffs.append(np.array([2.])) # constant
+        expected = Chebfun.batch_roots(coeffs)
+        computed = Chebfun.batch_roots(coeffs, solver='aberth')
+        for c, e in zip(computed, expected):
+            self.assertEqual(len(c), len(e))
+            npt.assert_allclose(np.sort(c), np.sort(e), atol=1e-12)
+
+    def test_aberth_random(self):
+        """
+        The Aberth iteration finds all the real roots of random series,
+        including those where iterates were once stopped too early.
+        """
+        rng = np.random.RandomState(0)
+        series = []
+        for trial in range(131):
+            n = rng.randint(5, 400)
+            series.append(rng.randn(n)*np.exp(-rng.rand()*np.arange(n)/n*5))
+        series = series[:20] + [series[40], series[130]]
+        expected = Chebfun.batch_roots(series)
+        computed = Chebfun.batch_roots(series, solver='aberth')
+        for c, e in zip(computed, expected):
+            self.assertEqual(len(c), len(e))
+            npt.assert_allclose(np.sort(c), np.sort(e), atol=1e-10)
+        w = 68.
+        p = Chebfun.from_function(lambda x: np.sin(w*x+.3) + .3*np.cos(.7*w*x**2))
+        npt.assert_allclose(p.roots(solver='aberth', max_size=p.size()), p.roots(), atol=1e-12)
+
+    def test_solver(self):
+        k = 300
+        p = Chebfun.from_function(lambda x: np.sin(k*x))
+        n = int(k/np.pi)
+        roots = p.roots(solver='aberth')
+        npt.assert_allclose(roots, np.arange(-n, n+1)*np.pi/k, atol=1e-13)
+        self.assertRaises(ValueError, p.roots, solver='qr')
+
+    def test_max_size(self):
+        """
+        Larger pieces mean fewer subdivisions.
+        """
+        k = 300
+        p = Chebfun.from_function(lambda x: np.sin(k*x))
+        pieces = Chebfun.subdivide(p.coefficients())
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual(len(Chebfun.subdivide(p.coefficients(), max_size=p.size())), 1)
+        expected = p.roots()
+        npt.assert_allclose(p.roots(solver='aberth', max_size=p.size()), expected, atol=1e-13)
+
 class TestPolyfitShape(unittest.TestCase):
     def test_scalar(self):
         for datalen in [1,3]:
@@ -556,6 +1294,35 @@ class Test_Arithmetic(unittest.TestCase):
         npt.assert_allclose(z(xs), np.zeros_like(xs), rtol=1e-7, atol=1e-8)
         self.assertEqual(z.size(), 1)
 
+    def test_prod_basis(self):
+        """
+        T_m T_n = (T_{m+n} + T_{|m-n|})/2 is computed exactly.
+        """
+        m, n = 7, 4
+        prod = Chebfun.basis(m) * Chebfun.basis(n)
+        self.assertEqual(prod.size(), m+n+1)
+        expected = np.zeros(m+n+1)
+        expected[m+n] += .5
+        expected[m-n] += .5
+        npt.assert_allclose(prod.coefficients(), expected, atol=1e-15)
+
+    def test_prod_size(self):
+        prod = self.p1*self.p2
+        self.assertLessEqual(prod.size(), self.p1.size() + self.p2.size() - 1)
+        assert_close(prod, lambda x: f(x)*runge(x), atol=1e-13)
+
+    def test_prod_zero(self):
+        """
+        A product with a zero fun is the single coefficient zero.
+        """
+        for zero in [0*self.p1, self.p1*0., Chebfun([0., 0., 0.])*self.p1]:
+            npt.assert_array_equal(zero.coefficients(), [0.])
+            npt.assert_array_equal(zero.values(), [0.])
+
+    def test_prod_complex(self):
+        c = np.exp(1j*Chebfun.identity())
+        assert_close(c*c, lambda x: np.exp(2j*x))
+
     def test_add_mistype(self):
         """
         Possible to add a Chebfun and a function 
@@ -585,6 +1352,15 @@ class TestVector(unittest.TestCase):
         m = s * v
         assert_close(m[0], s*v[0])
 
+    def test_vectorvectormult(self):
+        """
+        Product of vector chebfuns is computed componentwise.
+        """
+        c = Chebfun.from_function(circle)
+        m = c * c
+        assert_close(m, lambda x: circle(x)**2, atol=1e-13)
+        assert_close(m[0] + m[1], Chebfun(1.))
+
     def test_slice(self):
         """
         Test slicing: f[0] should return the first component.
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# coding: UTF-8
+from __future__ import division
+
+from pychebfun import *
+
+import numpy as np
+np.seterr(all='raise')
+import numpy.testing as npt
+
+import unittest
+
+from .tools import *
+
+class TestLazy(unittest.TestCase):
+    def setUp(self):
+        self.x = Chebfun.identity()
+        self.lx = self.x.lazy()
+
+    def test_readme(self):
+        """
+        The lazy expression gives the same fun as the eager one.
+        """
+        x, lx = self.x, self.lx
+        eager = np.tan(x+1/4) + np.cos(10*x**2 + np.exp(np.exp(x)))
+        expression = np.tan(lx+1/4) + np.cos(10*lx**2 + np.exp(np.exp(lx)))
+        self.assertIsInstance(expression, Expression)
+        result = expression.chebfun()
+        self.assertIsInstance(result, Chebfun)
+        assert_close(result, eager, atol=1e-12)
+
+    def test_one_construction(self):
+        """
+        The expression is materialised by a single construction.
+        """
+        calls = []
+        from_function = Chebfun.from_function
+        def counted(cls, *args, **kwargs):
+            calls.append(args)
+            return from_function(*args, **kwargs)
+        Chebfun.from_function = classmethod(counted)
+        try:
+            e = np.exp(np.sin(self.lx)*2 - self.lx**3)
+            e.chebfun()
+            e.chebfun()
+        finally:
+            del Chebfun.from_function
+        self.assertEqual(len(calls), 1)
+
+    def test_common_subexpression(self):
+        """
+        Identical subexpressions are the same node, evaluated once.
+        """
+        lx = self.lx
+        self.assertIs(np.sin(lx), np.sin(lx))
+        self.assertIs(lx**2 + 1, lx**2 + 1)
+        self.assertIsNot(lx**2, lx**3)
+        e = np.sin(lx) + np.sin(lx)*np.sin(lx)
+        # lx, sin(lx), the product and the sum
+        self.assertEqual(len(e._nodes_in_order()), 4)
+
+    def test_constants(self):
+        """
+        Constants are the same node only if they are exactly equal.
+        """
+        zero = Expression.constant(0.)
+        self.assertIsNot(Expression.constant(-0.), zero)
+        self.assertIsNot(Expression.constant(0), zero)
+        self.assertIs(Expression.constant(0.), zero)
+        nan = Expression.constant(np.nan)
+        self.assertIs(Expression.constant(np.nan), nan)
+        self.assertIsNot(self.lx + 0., self.lx + -0.)
+
+    def test_mixed(self):
+        """
+        Expressions combine with funs and scalars on both sides.
+        """
+        s = Chebfun.from_function(np.sin)
+        lx = self.lx
+        for e, expected in [
+                (s + lx, lambda x: np.sin(x) + x),
+                (lx * s, lambda x: x*np.sin(x)),
+                (s - lx, lambda x: np.sin(x) - x),
+                (2 - lx, lambda x: 2 - x),
+                (1/(2+lx), lambda x: 1/(2+x)),
+                (s/(2+lx), lambda x: np.sin(x)/(2+x)),
+                (2**lx, lambda x: 2**x),
+                (-abs(lx+2), lambda x: -abs(x+2)),
+                ]:
+            self.assertIsInstance(e, Expression)
+            assert_close(e, expected, atol=1e-14)
+            assert_close(e.chebfun(), expected, atol=1e-13)
+
+    def test_vector(self):
+        c = Chebfun.from_function(circle)
+        e = np.sin(self.lx) * c.lazy()
+        assert_close(e.chebfun(), lambda x: (np.sin(x)*circle(x).T).T, atol=1e-14)
+
+    def test_domain(self):
+        y = Chebfun.identity([0., 2.])
+        e = np.exp(y.lazy())
+        npt.assert_allclose(e.chebfun().domain(), [0., 2.])
+        with self.assertRaises(Chebfun.DomainMismatch):
+            self.lx + y.lazy()
+
+    def test_leaf(self):
+        self.assertIs(self.lx.chebfun(), self.x)
+
+    def test_tolerance(self):
+        """
+        The expression is constructed with the largest tolerance of its funs.
+        """
+        coarse = Chebfun.from_function(lambda x: x, tol=1e-6).lazy()
+        result = (np.sin(20*coarse)*self.lx).chebfun()
+        self.assertEqual(result.tolerance(), 1e-6)
+        self.assertLess(result.size(), (np.sin(20*self.lx)*self.lx).chebfun().size())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding: UTF-8
+from __future__ import division
+
+from pychebfun import *
+
+import numpy as np
+import numpy.testing as npt
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from .tools import *
+
+def mapped(array):
+    """
+    Whether the array is a view of a memory-mapped file.
+    """
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'funs.chebfun')
+        self.p = Chebfun.from_function(f, domain=[0., 2.], tol=1e-10)
+        self.x = np.linspace(0., 2., 50)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def assert_same(self, loaded, fun):
+        npt.assert_array_equal(loaded.values(), fun.values())
+        npt.assert_array_equal(loaded.coefficients(), fun.coefficients())
+        npt.assert_array_equal(loaded.domain(), fun.domain())
+        self.assertEqual(loaded.vscale(), fun.vscale())
+        self.assertEqual(loaded.tolerance(), fun.tolerance())
+        self.assertEqual(loaded.converged(), fun.converged())
+        self.assertEqual(loaded.tail(), fun.tail())
+        npt.assert_array_equal(loaded(self.x), fun(self.x))
+
+    def test_fun(self):
+        save(self.path, self.p)
+        for mmap in [True, False]:
+            loaded = load(self.path, mmap=mmap)
+            self.assert_same(loaded, self.p)
+            self.assertEqual(mapped(loaded.values()), mmap)
+
+    def test_mapped(self):
+        """
+        The loaded arrays are read-only views of the file, aligned in memory.
+        """
+        save(self.path, [self.p, Chebfun([1., 2.])])
+        loaded = load(self.path)
+        for fun in loaded:
+            for array in [fun.values(), fun.coefficients()]:
+                self.assertFalse(array.flags.writeable)
+                self.assertTrue(mapped(array))
+                self.assertEqual(array.ctypes.data % 64, 0)
+
+    def test_collections(self):
+        v = Chebfun.from_function(lambda x: np.array([np.cos(x), np.sin(x)]).T, domain=[0., 2.])
+        save(self.path, {'p': self.p, 'v': v, 'list': [self.p, -self.p]})
+        loaded = load(self.path)
+        self.assertEqual(sorted(loaded), ['list', 'p', 'v'])
+        self.assert_same(loaded['p'], self.p)
+        self.assert_same(loaded['v'], v)
+        self.assert_same(loaded['list'][1], -self.p)
+
+    def test_array(self):
+        funs = ChebfunArray.from_funs([Chebfun.from_function(lambda x, k=k: np.sin(k*x)) for k in range(1, 6)])
+        save(self.path, funs)
+        loaded = load(self.path)
+        npt.assert_array_equal(loaded.coefficients(), funs.coefficients())
+        npt.assert_array_equal(loaded.sizes(), funs.sizes())
+        self.assertTrue(mapped(loaded.coefficients()))
+        self.assertFalse(loaded.coefficients().flags.writeable)
+        npt.assert_array_equal(loaded(xs), funs(xs))
+        npt.assert_allclose(loaded.sum(), funs.sum())
+
+    def test_errors(self):
+        self.assertRaises(TypeError, save, self.path, 'fun')
+        with open(self.path, 'wb') as stream:
+            stream.write(b'not a chebfun file')
+        self.assertRaises(ValueError, load, self.path)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding: UTF-8
+from __future__ import division
+
+from pychebfun import *
+from pychebfun import transform
+
+import numpy as np
+np.seterr(all='raise')
+import numpy.testing as npt
+
+import unittest
+
+from .tools import *
+
+def reference_dct1(data):
+    """
+    DCT of type I computed with the FFT of the even extension.
+    """
+    N = len(data)
+    return np.fft.fft(even_data(data), axis=0)[:N]
+
+class HarnessBackend(object):
+    def setUp(self):
+        self.previous = get_backend()
+        if self.backend not in available_backends():
+            self.skipTest('{} is not installed'.format(self.backend))
+        set_backend(self.backend)
+
+    def tearDown(self):
+        set_backend(self.previous)
+
+    def test_dct1(self):
+        data = np.random.rand(9)
+        npt.assert_allclose(transform.dct1(data), reference_dct1(data))
+
+    def test_dct1_vector(self):
+        data = np.random.rand(9, 3)
+        result = transform.dct1(data)
+        self.assertEqual(result.shape, (9, 3))
+        npt.assert_allclose(result, reference_dct1(data))
+
+    def test_dct1_complex(self):
+        data = np.random.rand(9) + 1j*np.random.rand(9)
+        npt.assert_allclose(transform.dct1(data), reference_dct1(data))
+
+    def test_real(self):
+        data = np.random.rand(9)
+        self.assertTrue(np.isrealobj(transform.dct1(data)))
+
+    def test_workers(self):
+        data = np.random.rand(33)
+        npt.assert_allclose(transform.dct1(data, workers=2), reference_dct1(data))
+
+    def test_polyfitval(self):
+        data = np.random.rand(17, 2)
+        npt.assert_allclose(Chebfun.polyval(Chebfun.polyfit(data)), data)
+
+    def test_chebfun(self):
+        p = Chebfun.from_function(f)
+        assert_close(p, f, atol=1e-13)
+
+global_dict = globals()
+for backend in ['scipy', 'numpy', 'fftpack', 'pyfftw']:
+    cls_name = 'TestBackend_{}'.format(backend)
+    global_dict[cls_name] = type(cls_name, (HarnessBackend, unittest.TestCase), {'backend': backend})
+
+class TestConfig(unittest.TestCase):
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            set_backend('unknown')
+
+    def test_dct(self):
+        """
+        dct on the extended data vector gives the Chebyshev coefficients
+        """
+        data = np.random.rand(9)
+        npt.assert_allclose(dct(even_data(data)), Chebfun.polyfit(data))